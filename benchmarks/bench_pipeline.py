@@ -0,0 +1,73 @@
+# Benchmark of the snowglober pipeline on synthetic accounts, offline.
+# Snowflake is replaced by ReplayConnector serving synthetic fixtures and terraform by fake_terraform.py.
+# Run with: python benchmarks/bench_pipeline.py [--sizes 1000 10000 100000] [--import-mode batch]
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..'))
+
+from snowglober.generate_tf_config import TerraformConfigGenerator
+from snowglober.replay import ReplayConnector
+from synthetic_account import write_synthetic_account
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+STEPS = ["write_resource_configs_to_tf_files", "run_terraform_init", "import_resources", "update_tf_files_with_optional_properties"]
+
+@contextlib.contextmanager
+def fake_terraform_on_path(tmp_dir):
+    """
+    This function puts fake_terraform.py on the PATH as 'terraform' for the duration of the context.
+    """
+    bin_dir = os.path.join(tmp_dir, 'bin')
+    os.makedirs(bin_dir)
+    os.symlink(os.path.join(BENCHMARKS_DIR, 'fake_terraform.py'), os.path.join(bin_dir, 'terraform'))
+    original_path = os.environ.get('PATH', '')
+    os.environ['PATH'] = bin_dir + os.pathsep + original_path
+    try:
+        yield
+    finally:
+        os.environ['PATH'] = original_path
+
+def run_benchmark(size, import_mode, shards):
+    """
+    This function runs the pipeline on a synthetic account of the given size and returns the time taken by each step.
+    """
+    original_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir, fake_terraform_on_path(tmp_dir):
+        fixture_dir = os.path.join(tmp_dir, 'fixtures')
+        number_of_objects = sum(write_synthetic_account(fixture_dir, size).values())
+        os.chdir(tmp_dir)
+        try:
+            generator = TerraformConfigGenerator(ReplayConnector(fixture_dir), import_mode=import_mode, shards=shards)
+            timings = {}
+            for step in STEPS:
+                start_time = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    getattr(generator, step)()
+                timings[step] = time.perf_counter() - start_time
+        finally:
+            os.chdir(original_cwd)
+    return number_of_objects, timings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the snowglober pipeline on synthetic accounts.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--import-mode", choices=["batch", "single"], default="batch",
+                        help="'single' starts one fake terraform process per object, so keep the sizes small.")
+    parser.add_argument("--shards", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    print(f"{'objects':>8} " + " ".join(f"{step[:24]:>24}" for step in STEPS) + f" {'total':>8}")
+    for size in args.sizes:
+        number_of_objects, timings = run_benchmark(size, args.import_mode, args.shards)
+        print(f"{number_of_objects:>8} " + " ".join(f"{timings[step]:>23.3f}s" for step in STEPS) + f" {sum(timings.values()):>7.3f}s")
+
+if __name__ == "__main__":
+    main()
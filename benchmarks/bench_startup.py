@@ -0,0 +1,46 @@
+# Benchmark of the startup time of the snowglober command, i.e. interpreter start plus imports.
+# Each case runs in a fresh interpreter; the best of --runs runs is printed, as the others only add noise.
+# Run with: python benchmarks/bench_startup.py [--runs 10]
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.join(BENCHMARKS_DIR, '..')
+
+CASES = {
+    "python -c pass": ["-c", "pass"],
+    "import snowglober.cli": ["-c", "import snowglober.cli"],
+    "snowglober --help": ["-m", "snowglober.cli", "--help"],
+    "snowglober vars": ["-m", "snowglober.cli", "vars"],
+    "import snowflake.connector": ["-c", "import snowflake.connector"],
+}
+
+def time_case(args, runs):
+    """
+    This function runs python with args runs times in a temporary directory and returns the shortest wall time.
+    """
+    env = {**os.environ, 'PYTHONPATH': os.path.abspath(PACKAGE_DIR)}
+    timings = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for _ in range(runs):
+            start_time = time.perf_counter()
+            subprocess.run([sys.executable, *args], cwd=tmp_dir, env=env, check=True, stdout=subprocess.DEVNULL)
+            timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of the snowglober command.")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    print(f"{'case':<28} {'best':>8}")
+    for name, case_args in CASES.items():
+        print(f"{name:<28} {time_case(case_args, args.runs) * 1000:>6.0f}ms")
+
+if __name__ == "__main__":
+    main()
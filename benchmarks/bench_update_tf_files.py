@@ -0,0 +1,58 @@
+# Benchmark of TerraformConfigGenerator.update_tf_files_with_optional_properties on synthetic accounts.
+# Run with: python benchmarks/bench_update_tf_files.py [number of resources ...]
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from snowglober.generate_tf_config import TerraformConfigGenerator
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+def write_synthetic_account(generator, number_of_users):
+    """
+    This function writes a snowflake_user.tf file with required properties only
+    and a terraform.tfstate with optional properties for number_of_users users.
+    """
+    names = [f"USER_{i}" for i in range(number_of_users)]
+    with open('target/snowflake_user.tf', 'w') as f:
+        for name in names:
+            f.write(f'resource "snowflake_user" "{name}" {{\n    name = "{name}"\n    login_name = "{name}"\n}}\n\n')
+
+    state = {"version": 4, "resources": [
+        {"type": "snowflake_user", "name": name, "instances": [{"attributes": {
+            "name": name, "login_name": name, "comment": f"Comment of {name}", "default_role": "PUBLIC",
+            "default_warehouse": "COMPUTE_WH", "disabled": False, "email": f"{name.lower()}@example.com",
+            "default_secondary_roles": [], "rsa_public_key": None}}]}
+        for name in names
+    ]}
+    with open(generator.tfstate_file_path, 'w') as f:
+        json.dump(state, f)
+
+def main(sizes):
+    """
+    This function times the optional property step for each number of resources in sizes.
+    """
+    original_cwd = os.getcwd()
+    print(f"{'resources':>10} {'seconds':>10} {'us/resource':>12}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                generator = TerraformConfigGenerator(connector=None)
+                generator.resources_to_generate = [{"resource_type": "snowflake_user", "entity": "users"}]
+                write_synthetic_account(generator, size)
+
+                start_time = time.perf_counter()
+                generator.update_tf_files_with_optional_properties()
+                elapsed_time = time.perf_counter() - start_time
+            finally:
+                os.chdir(original_cwd)
+        print(f"{size:>10} {elapsed_time:>10.3f} {elapsed_time / size * 1e6:>12.1f}")
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or DEFAULT_SIZES)
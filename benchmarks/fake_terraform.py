@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# A stand-in for the terraform cli, used to run and benchmark snowglober without Terraform or Snowflake.
+# It supports the commands snowglober runs: version, init, import, apply (import blocks only) and state list/rm.
+# Imported resources get their name from the import ID and a fixed comment as attributes.
+
+import json
+import os
+import re
+import sys
+import uuid
+
+FAKE_TERRAFORM_VERSION = "1.5.7"
+
+def load_state(working_dir):
+    state_path = os.path.join(working_dir, 'terraform.tfstate')
+    if not os.path.exists(state_path):
+        return {"version": 4, "terraform_version": FAKE_TERRAFORM_VERSION, "serial": 0,
+                "lineage": str(uuid.uuid4()), "outputs": {}, "resources": []}
+    with open(state_path, 'r') as f:
+        return json.load(f)
+
+def save_state(working_dir, state):
+    state["serial"] += 1
+    with open(os.path.join(working_dir, 'terraform.tfstate'), 'w') as f:
+        json.dump(state, f, indent=2)
+
+def managed_resource_names(state):
+    return {f"{resource['type']}.{resource['name']}" for resource in state["resources"]}
+
+def add_resource(state, resource_name, resource_id, managed_resource_names):
+    resource_type, name = resource_name.split(".", 1)
+    if resource_name in managed_resource_names:
+        sys.exit(f"Error: Resource already managed by Terraform: {resource_name}")
+    managed_resource_names.add(resource_name)
+    state["resources"].append({
+        "mode": "managed",
+        "type": resource_type,
+        "name": name,
+        "provider": 'provider["registry.terraform.io/snowflake-labs/snowflake"]',
+        "instances": [{"schema_version": 0, "attributes": {
+            "id": resource_id, "name": resource_id.split("|")[-1], "comment": "Imported by fake terraform"}}],
+    })
+
+def unescape_string(value):
+    # Reverses the escaping of snowglober.hcl.escape_string
+    return json.loads(f'"{value}"').replace("$${", "${").replace("%%{", "%{")
+
+def main(args):
+    working_dir = '.'
+    if args and args[0].startswith("-chdir="):
+        working_dir = args.pop(0).split("=", 1)[1]
+    command = args[0] if args else None
+
+    if command == "version":
+        print(json.dumps({"terraform_version": FAKE_TERRAFORM_VERSION}))
+    elif command == "init":
+        os.makedirs(os.path.join(working_dir, '.terraform'), exist_ok=True)
+        with open(os.path.join(working_dir, '.terraform.lock.hcl'), 'w') as f:
+            f.write('# fake lock file\n')
+    elif command == "import":
+        state = load_state(working_dir)
+        add_resource(state, args[1], args[2], managed_resource_names(state))
+        save_state(working_dir, state)
+    elif command == "apply":
+        state = load_state(working_dir)
+        with open(os.path.join(working_dir, 'imports.tf'), 'r') as f:
+            imports = re.findall(r'to = (\S+)\n\s*id = "((?:[^"\\]|\\.)*)"', f.read())
+        managed = managed_resource_names(state)
+        for resource_name, resource_id in imports:
+            add_resource(state, resource_name, unescape_string(resource_id), managed)
+        save_state(working_dir, state)
+    elif command == "state" and args[1] == "list":
+        for resource_name in sorted(managed_resource_names(load_state(working_dir))):
+            print(resource_name)
+    elif command == "state" and args[1] == "rm":
+        state = load_state(working_dir)
+        resource_names = set(args[2:])
+        state["resources"] = [resource for resource in state["resources"]
+                              if f"{resource['type']}.{resource['name']}" not in resource_names]
+        save_state(working_dir, state)
+    else:
+        sys.exit(f"fake terraform: unsupported command {args}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,57 @@
+# Synthetic Snowflake accounts for offline tests and benchmarks.
+# The SHOW results of the account are written as fixtures that ReplayConnector serves back.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from snowglober.replay import ReplayConnector, write_fixture
+
+def write_synthetic_account(fixture_dir, number_of_objects):
+    """
+    This function writes the fixtures of a synthetic account with about number_of_objects objects.
+    Most objects are users; there is a database per 100 objects with two schemas each, a stage and a file format per schema,
+    a role per 10 objects granted to a user and a warehouse per 500 objects.
+    It returns the number of objects per entity.
+    """
+    connector = ReplayConnector(fixture_dir)
+    number_of_databases = max(1, number_of_objects // 100)
+    number_of_roles = max(1, number_of_objects // 10)
+    number_of_warehouses = max(1, number_of_objects // 500)
+    number_of_schemas = 2 * number_of_databases
+    number_of_users = max(1, number_of_objects - number_of_databases - 2 * number_of_roles - number_of_warehouses - 3 * number_of_schemas)
+
+    def write(entity, rows, container=None):
+        write_fixture(fixture_dir, connector._build_show_query(entity, container), rows)
+
+    databases = [f"DATABASE_{i}" for i in range(number_of_databases)]
+    write('databases', ({"name": name, "comment": f"Database {name}", "retention_time": "1", "options": ""} for name in databases))
+    write('roles', ({"name": f"ROLE_{i}", "comment": ""} for i in range(number_of_roles)))
+    write('users', ({"name": f"USER_{i}", "login_name": f"USER_{i}", "email": f"user_{i}@example.com", "disabled": "false",
+                     "default_role": f"ROLE_{i % number_of_roles}", "default_secondary_roles": '["ALL"]'}
+                    for i in range(number_of_users)))
+    write('warehouses', ({"name": f"WAREHOUSE_{i}", "size": "X-Small", "auto_suspend": 60, "auto_resume": "true", "type": "STANDARD"}
+                         for i in range(number_of_warehouses)))
+
+    for database in databases:
+        schemas = ["PUBLIC", "STAGING"]
+        write('schemas', [{"name": schema, "database_name": database, "options": ""} for schema in schemas + ["INFORMATION_SCHEMA"]], (database,))
+        for schema in schemas:
+            write('stages', [{"name": "LANDING", "database_name": database, "schema_name": schema, "url": "s3://landing/"}], (database, schema))
+            write('file formats', [{"name": "CSV", "database_name": database, "schema_name": schema, "type": "CSV"}], (database, schema))
+            write('sequences', [], (database, schema))
+
+    for i in range(number_of_roles):
+        write('grants', [{"role": f"ROLE_{i}", "granted_to": "USER", "grantee_name": f"USER_{i % number_of_users}"}], (f"ROLE_{i}",))
+
+    return {
+        "databases": number_of_databases,
+        "schemas": number_of_schemas,
+        "stages": number_of_schemas,
+        "file formats": number_of_schemas,
+        "roles": number_of_roles,
+        "role grants": number_of_roles,
+        "users": number_of_users,
+        "warehouses": number_of_warehouses,
+    }
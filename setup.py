@@ -2,16 +2,18 @@ from setuptools import setup, find_packages
 
 setup(
     name='snowglober',
-    version='0.4.0',
+    version='0.23.0',
     author='Amir Jaber',
     author_email='amir@rittmananalytics.com',
+    packages=find_packages(exclude=('tests', 'benchmarks')),
     install_requires=[
-        'pandas',
-        'sqlalchemy',
         'snowflake-connector-python',
         'python-dotenv',
         # 'terraform', # manually install terraform, not yet available on PyPi
     ],
+    entry_points={
+        'console_scripts': ['snowglober=snowglober.cli:main'],
+    },
     url='https://github.com/rittmananalytics/snowglober',
     description='A Python package for exporting Snowflake resources using Terraform',
     long_description=open('README.md').read(),  # Get long description from the README file
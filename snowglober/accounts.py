@@ -0,0 +1,117 @@
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import dotenv_values
+
+# Names of the credentials of an account, the same as the environment variables of a single-account run
+CREDENTIAL_NAMES = (
+    'SNOWFLAKE_ACCOUNT',
+    'SNOWFLAKE_USERNAME',
+    'SNOWFLAKE_PASSWORD',
+    'SNOWFLAKE_WAREHOUSE',
+    'SNOWFLAKE_DATABASE',
+    'SNOWFLAKE_SCHEMA',
+    'SNOWFLAKE_ROLE',
+)
+
+SUMMARY_FILE_NAME = 'accounts_summary.json'
+
+
+def load_accounts_config(file_path):
+    """
+    This function reads a multi-account config file and fills in its defaults.
+    The file is a JSON object such as
+    {"output_dir": "target", "max_workers": 4, "plugin_cache_dir": "target/.plugin-cache",
+     "accounts": [{"name": "prod", "env_file": ".env.prod"}, {"name": "dev", "env_prefix": "DEV_"}]}.
+    Each account's files are written to <output_dir>/<name>.
+    It raises ValueError if the config has no accounts or an account name isn't a plain directory name.
+    """
+    with open(file_path, 'r') as f:
+        config = json.load(f)
+
+    config.setdefault("output_dir", "target")
+    config.setdefault("max_workers", 4)
+    config.setdefault("plugin_cache_dir", os.path.join(config["output_dir"], ".plugin-cache"))
+
+    accounts = config.get("accounts") or []
+    if not accounts:
+        raise ValueError(f"No accounts found in {file_path}")
+    names = [account.get("name") for account in accounts]
+    for name in names:
+        if not name or name in (".", "..") or os.sep in name or (os.altsep and os.altsep in name):
+            raise ValueError(f"Invalid account name '{name}' in {file_path}. It's used as a directory name")
+    if len(set(names)) != len(names):
+        raise ValueError(f"Account names in {file_path} should be unique")
+    return config
+
+
+def resolve_credentials(account):
+    """
+    This function returns the credentials of an account, keyed by the names in CREDENTIAL_NAMES.
+    They're read from the account's credential sources, later sources overriding earlier ones:
+    env_file, a .env file of the account; env_prefix, a prefix of environment variables
+    (e.g. 'DEV_' reads DEV_SNOWFLAKE_ACCOUNT); and credentials, a dictionary in the config itself.
+    The process's environment isn't changed, so accounts can run side by side.
+    """
+    credentials = {}
+    if account.get("env_file"):
+        credentials.update(dotenv_values(account["env_file"]))
+    if account.get("env_prefix"):
+        for name in CREDENTIAL_NAMES:
+            value = os.environ.get(account["env_prefix"] + name)
+            if value is not None:
+                credentials[name] = value
+    credentials.update(account.get("credentials", {}))
+    return {name: credentials[name] for name in CREDENTIAL_NAMES if credentials.get(name) is not None}
+
+
+def run_accounts(config, run_account, max_workers=None):
+    """
+    This function runs run_account(name, target_dir, credentials, plugin_cache_dir) for every account of a config
+    in a pool of at most max_workers threads (the config's max_workers by default).
+    Terraform's plugin cache, plugin_cache_dir, is shared by all accounts, so the provider is only downloaded once.
+    run_account returns a dictionary of figures for the summary. An account that fails doesn't stop the others.
+    It returns the summary, one dictionary per account in the order of the config,
+    and writes it to <output_dir>/accounts_summary.json.
+    """
+    os.makedirs(config["output_dir"], exist_ok=True)
+    plugin_cache_dir = os.path.abspath(config["plugin_cache_dir"])
+    os.makedirs(plugin_cache_dir, exist_ok=True)
+
+    def run(account):
+        target_dir = os.path.join(config["output_dir"], account["name"])
+        start_time = time.perf_counter()
+        summary = {"account": account["name"], "target_dir": target_dir}
+        try:
+            summary.update(run_account(account["name"], target_dir, resolve_credentials(account), plugin_cache_dir))
+            summary["status"] = "succeeded"
+        except Exception as e:
+            traceback.print_exc()
+            summary["status"] = "failed"
+            summary["error"] = f"{type(e).__name__}: {e}"
+        summary["wall_time"] = round(time.perf_counter() - start_time, 3)
+        return summary
+
+    accounts = config["accounts"]
+    with ThreadPoolExecutor(max_workers=max_workers or config["max_workers"]) as executor:
+        summaries = list(executor.map(run, accounts))
+
+    with open(os.path.join(config["output_dir"], SUMMARY_FILE_NAME), 'w') as f:
+        json.dump(summaries, f, indent=2)
+    return summaries
+
+
+def print_summary(summaries):
+    """
+    This function prints the summary returned by run_accounts as a table.
+    """
+    print(f"{'account':<24} {'status':<10} {'objects':>8} {'imported':>9} {'failures':>9} {'time':>9}")
+    for summary in summaries:
+        print(f"{summary['account']:<24} {summary['status']:<10} {summary.get('objects', '-'):>8} "
+              f"{summary.get('imported', '-'):>9} {summary.get('import_failures', '-'):>9} {summary['wall_time']:>8.1f}s")
+    failed = [summary for summary in summaries if summary["status"] == "failed"]
+    for summary in failed:
+        print(f"{summary['account']} failed: {summary['error']}")
+    print(f"{len(summaries) - len(failed)} of {len(summaries)} accounts exported.")
@@ -0,0 +1,149 @@
+# command line interface of the snowglober command
+# snowflake.connector, by far the slowest import, is only imported by the commands that query Snowflake
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+from snowglober.drift import DRIFT_REPORT_FILE_NAME, detect_drift, has_drift, write_drift_report
+from snowglober.instrumentation import RunReport
+from snowglober.main import add_cache_arguments, add_generator_arguments, make_connector, make_generator
+from snowglober.main import main as run_main
+
+COMMANDS = {
+    "vars": "Write variables.tf, providers.tf and terraform.tfvars.",
+    "extract": "Query Snowflake and write the .tf files with the required properties of each resource.",
+    "render": "Query Snowflake and write complete .tf files from the SHOW output, without 'terraform import'.",
+    "diff": "Compare the .tf files with Snowflake and report the added, removed and changed objects, without changing anything.",
+    "import": "Run 'terraform init' and import the extracted resources into the Terraform state.",
+    "patch": "Add the optional properties in the Terraform state to the .tf files.",
+    "run": "Run the whole pipeline; takes the same arguments as snowglober/main.py.",
+}
+
+def parse_args(argv=None):
+    """
+    This function parses the command line arguments of the snowglober command.
+    """
+    parser = argparse.ArgumentParser(prog="snowglober", description="Export Snowflake resources to Terraform configs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command, description in COMMANDS.items():
+        if command == "run":
+            # The arguments of 'run' are parsed by main.py, see main()
+            subparsers.add_parser(command, help=description, description=description)
+            continue
+        subparser = subparsers.add_parser(command, help=description, description=description)
+        add_generator_arguments(subparser)
+        if command in ("extract", "render"):
+            add_cache_arguments(subparser)
+        if command == "render":
+            subparser.add_argument("--write-state", action="store_true",
+                                   help="Also write a matching terraform.tfstate.")
+        if command == "diff":
+            # Drift is checked against live metadata, so the cache is off unless asked for
+            add_cache_arguments(subparser, default_ttl=0)
+            subparser.add_argument("--output",
+                                   help=f"Write the JSON report to this file instead of target/{DRIFT_REPORT_FILE_NAME}, '-' for stdout.")
+            subparser.add_argument("--detailed-exitcode", action="store_true",
+                                   help="Exit with status 2 if anything drifted, like 'terraform plan -detailed-exitcode'.")
+    return parser.parse_args(argv)
+
+def vars_command(args):
+    """
+    This function writes the files Terraform needs to connect to Snowflake.
+    The variables are read from the environment and the .env file.
+    """
+    load_dotenv()
+    generator = make_generator(args, None, RunReport(), args.target_dir)
+    generator.generate_variables_tf_file()
+    generator.generate_providers_tf_file()
+    generator.add_missing_environment_variables_to_tfvars_file()
+
+def extract_command(args):
+    """
+    This function writes the .tf files with the required properties, and saves the resources to import
+    for the import command.
+    """
+    report = RunReport()
+    generator = make_generator(args, make_connector(args, report, args.target_dir), report, args.target_dir)
+    generator.write_resource_configs_to_tf_files()
+    generator.save_extraction()
+
+def render_command(args):
+    """
+    This function writes complete .tf files, and optionally the state, from the SHOW output.
+    """
+    report = RunReport()
+    generator = make_generator(args, make_connector(args, report, args.target_dir), report, args.target_dir)
+    generator.write_complete_resource_configs_to_tf_files(write_state=args.write_state)
+
+def import_command(args):
+    """
+    This function imports the resources saved by the extract command into the Terraform state.
+    """
+    generator = make_generator(args, None, RunReport(), args.target_dir)
+    try:
+        generator.load_extraction()
+    except FileNotFoundError:
+        sys.exit(f"Nothing to import in {args.target_dir}, run 'snowglober extract' first.")
+    generator.run_terraform_init()
+    generator.import_resources()
+
+def diff_command(args):
+    """
+    This function reports the drift between the .tf files and Snowflake. It doesn't change any file or the state.
+    Progress is printed to stderr, so that the report can be written to stdout.
+    """
+    report = RunReport()
+    with contextlib.redirect_stdout(sys.stderr):
+        generator = make_generator(args, make_connector(args, report, args.target_dir), report, args.target_dir)
+        try:
+            drift_report = detect_drift(generator)
+        except FileNotFoundError as e:
+            sys.exit(f"{e}, run 'snowglober extract' first.")
+        summary = drift_report["summary"]
+        print(f"{summary['added']} added, {summary['removed']} removed, {summary['changed']} changed "
+              f"and {summary['unchanged']} unchanged resources in {drift_report['wall_time']:.1f}s.")
+    output = args.output or os.path.join(args.target_dir, DRIFT_REPORT_FILE_NAME)
+    if output == "-":
+        print(json.dumps(drift_report, indent=2, default=str))
+    else:
+        write_drift_report(drift_report, output)
+        print(f"Drift report written to {output}.", file=sys.stderr)
+    if args.detailed_exitcode and has_drift(drift_report):
+        sys.exit(2)
+
+def patch_command(args):
+    """
+    This function adds the optional properties in the Terraform state to the .tf files.
+    The files are patched with the options they were extracted with, if they were written by the extract command.
+    """
+    generator = make_generator(args, None, RunReport(), args.target_dir)
+    if os.path.exists(generator.extraction_file_path):
+        generator.load_extraction()
+    generator.update_tf_files_with_optional_properties()
+
+def main(argv=None):
+    """
+    This function is the entry point of the snowglober command.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ["run"]:
+        run_main(argv[1:])
+        return
+    args = parse_args(argv)
+    commands = {
+        "vars": vars_command,
+        "extract": extract_command,
+        "render": render_command,
+        "import": import_command,
+        "patch": patch_command,
+        "diff": diff_command,
+    }
+    commands[args.command](args)
+
+if __name__ == "__main__":
+    main()
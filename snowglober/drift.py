@@ -0,0 +1,109 @@
+import json
+import time
+
+# Name of the file the diff command writes its report to, in the target directory
+DRIFT_REPORT_FILE_NAME = 'drift_report.json'
+
+
+def _normalize(value):
+    """
+    This function normalizes a property value for comparison.
+    Empty strings and empty lists are the same as a missing value, as they are for the SHOW column converters,
+    and lists of strings are compared regardless of their order, e.g. the roles a role is granted to.
+    """
+    if value == "" or value == []:
+        return None
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return sorted(value)
+    return value
+
+
+def _compared_properties(resource_schema, tf_properties):
+    """
+    This function returns the properties of a resource to compare with Snowflake.
+    The required properties are always compared. The properties read from the SHOW columns are compared
+    when the .tf file sets them, or when it sets any optional property at all: the file then holds the complete
+    resource, as written by the patch step or a direct render, so a property it leaves out has no value.
+    A file with only the required properties, as written by the extract step, says nothing about the others.
+    """
+    complete = any(key in resource_schema.optional_properties for key in tf_properties)
+    return [*resource_schema.required_properties,
+            *(key for key in resource_schema.show_columns
+              if key not in resource_schema.required_properties and (complete or key in tf_properties))]
+
+
+def diff_resource_configs(resource_schemas, tf_configs, snowflake_configs, resource_ids=None):
+    """
+    This function compares the resources of the .tf files with the objects in Snowflake.
+    tf_configs and snowflake_configs are dictionaries of Terraform resource name to properties,
+    as returned by TerraformConfigGenerator.read_resource_configs_from_tf_files and read_resource_configs_from_snowflake.
+    resource_ids, if given, maps Terraform resource names to import IDs (the generator's snapshot) and is added to the report.
+    It returns a dictionary with the resources that were added in Snowflake, removed from it and changed,
+    each change listing the properties that differ with their value in the .tf file ('tf') and in Snowflake ('snowflake').
+    """
+    resource_ids = resource_ids or {}
+
+    def entry(tf_resource_name):
+        resource_type, name = tf_resource_name.split(".", 1)
+        resource_entry = {"address": tf_resource_name, "type": resource_type, "name": name}
+        if tf_resource_name in resource_ids:
+            resource_entry["id"] = resource_ids[tf_resource_name]["id"]
+        return resource_entry
+
+    added = [{**entry(tf_resource_name), "properties": properties}
+             for tf_resource_name, properties in sorted(snowflake_configs.items()) if tf_resource_name not in tf_configs]
+    removed = [entry(tf_resource_name) for tf_resource_name in sorted(tf_configs) if tf_resource_name not in snowflake_configs]
+
+    changed = []
+    unchanged = 0
+    for tf_resource_name in sorted(tf_configs.keys() & snowflake_configs.keys()):
+        tf_properties = tf_configs[tf_resource_name]
+        snowflake_properties = snowflake_configs[tf_resource_name]
+        resource_schema = resource_schemas[tf_resource_name.split(".", 1)[0]]
+        changes = {}
+        for key in _compared_properties(resource_schema, tf_properties):
+            tf_value = tf_properties.get(key)
+            snowflake_value = snowflake_properties.get(key)
+            if _normalize(tf_value) != _normalize(snowflake_value):
+                changes[key] = {"tf": tf_value, "snowflake": snowflake_value}
+        if changes:
+            changed.append({**entry(tf_resource_name), "changes": changes})
+        else:
+            unchanged += 1
+
+    return {
+        "summary": {"added": len(added), "removed": len(removed), "changed": len(changed), "unchanged": unchanged},
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+    }
+
+
+def detect_drift(generator):
+    """
+    This function compares the .tf files in the generator's target directory with the objects in Snowflake
+    and returns the report of diff_resource_configs, with the time it took.
+    It's read-only: it doesn't write any .tf file or run Terraform, so the state isn't touched.
+    It raises FileNotFoundError if the target directory has no .tf files to compare with.
+    """
+    start_time = time.perf_counter()
+    tf_configs = generator.read_resource_configs_from_tf_files()
+    snowflake_configs = generator.read_resource_configs_from_snowflake()
+    report = diff_resource_configs(generator.resource_schemas, tf_configs, snowflake_configs, generator.snapshot)
+    report["wall_time"] = round(time.perf_counter() - start_time, 3)
+    return report
+
+
+def write_drift_report(report, file_path):
+    """
+    This function writes a drift report as JSON.
+    """
+    with open(file_path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+
+
+def has_drift(report):
+    """
+    This function returns True if a drift report has any added, removed or changed resource.
+    """
+    return any(report["summary"][key] for key in ("added", "removed", "changed"))
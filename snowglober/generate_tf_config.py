@@ -1,39 +1,203 @@
+import glob
+import hashlib
 import json
 import os
 import re
+import shutil
 import subprocess
 import textwrap
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from snowglober.hcl import (HCLFileWriter, escape_templates, parse_block_body, render_attribute, render_string, sanitize_identifier,
+                            unescape_templates)
+from snowglober.instrumentation import RunReport
+from snowglober.resource_schema import compile_resource_schemas
+from snowglober.scheduler import ContainerScheduler
+
+# Terraform version from which `import {}` blocks are supported
+IMPORT_BLOCKS_MIN_TERRAFORM_VERSION = (1, 5, 0)
+
+# Patterns matching the first line of a resource block and a property line in the generated .tf files
+RESOURCE_LINE_PATTERN = re.compile(r'resource "([^"]+)" "([^"]+)" {')
+PROPERTY_LINE_PATTERN = re.compile(r'    (\w+)\s*=')
+
+# Pattern matching the error output of a 'terraform import' that failed for a reason worth retrying,
+# e.g. a network error or Snowflake throttling, as opposed to an invalid ID or a missing object
+TRANSIENT_ERROR_PATTERN = re.compile(
+    r'timeout|timed out|deadline exceeded|connection reset|connection refused|temporar|too many requests'
+    r'|\b429\b|\b50[234]\b|unexpected EOF|state lock', re.IGNORECASE)
+
+# Version of the Snowflake provider pinned in providers.tf; the resource types and properties in valid_properties are those of this version
+SNOWFLAKE_PROVIDER_VERSION = "0.87.0"
+
+# Terraform's plugin cache isn't safe for concurrent 'terraform init' runs,
+# so the generators of a multi-account run take turns
+TERRAFORM_INIT_LOCK = threading.Lock()
+
+# Provider address of the Snowflake provider, as written in terraform.tfstate
+SNOWFLAKE_PROVIDER_ADDRESS = 'provider["registry.terraform.io/snowflake-labs/snowflake"]'
+
+# Converters from a SHOW column value to a provider attribute value.
+# They return None when the column has no value, in which case the attribute is left out.
+def _show_value_to_str(value):
+    if value is None or value == "" or value == "null":
+        return None
+    return str(value)
+
+def _show_value_to_bool(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() == "true"
+
+def _show_value_to_int(value):
+    if value is None or value == "" or value == "null":
+        return None
+    return int(value)
+
+def _show_value_to_list(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, list):
+        return value
+    return json.loads(value)  # e.g. '["ALL"]'
+
+def _show_value_to_upper(value):
+    value = _show_value_to_str(value)
+    return value.upper() if value is not None else None
+
+def _show_options_to_is_transient(value):
+    return "TRANSIENT" in (value or "").upper()
+
+def _show_options_to_is_managed(value):
+    return "MANAGED ACCESS" in (value or "").upper()
+
+def _role_grants_from_show_grants(container, rows):
+    """
+    This function turns the rows of SHOW GRANTS OF ROLE <role> into a single object
+    holding the roles and users the role is granted to. Roles granted to nobody get no object.
+    """
+    if not rows:
+        return []
+    grantees = {"ROLE": set(), "USER": set()}
+    for row in rows:
+        grantees.setdefault(row["granted_to"], set()).add(row["grantee_name"])
+    return [{"name": container[0], "roles": sorted(grantees["ROLE"]), "users": sorted(grantees["USER"])}]
+
+# Resource types whose objects are the containers of each kind of container
+CONTAINER_RESOURCE_TYPES = {
+    "database": "snowflake_database",
+    "schema": "snowflake_schema",
+    "role": "snowflake_role",
+}
 
 class TerraformConfigGenerator:
 
-    def __init__(self, connector):
+    def __init__(self, connector, import_mode="auto", shards=1, shard_by="hash", incremental=False, max_parallelism=8, report=None,
+                 import_retries=3, retry_backoff=2.0, output_format="hcl", target_dir="target",
+                 provider_version=SNOWFLAKE_PROVIDER_VERSION, plugin_cache_dir=None, plugin_dir=None):
         """
         This method is called when the class is instantiated.
         It sets up the class attributes.
+        The import_mode decides how resources are imported into the Terraform state:
+        'batch' imports all resources in a single Terraform run using `import {}` blocks (Terraform 1.5+),
+        'single' runs 'terraform import' once per resource and
+        'auto' picks 'batch' when the installed Terraform version supports it.
+        With shards > 1 the resources are split into that many shards (by resource 'type' or by name 'hash'),
+        each imported in parallel in its own working directory under the target directory before the states are merged.
+        With incremental set, only the objects that are new or changed since the last run are rewritten and imported,
+        and the objects dropped since then are removed from the state.
+        max_parallelism is the maximum number of per-container SHOW queries (e.g. one per database) run at once.
+        report is the RunReport the stages of the run are recorded in; a new one is created if it isn't given.
+        A 'terraform import' that fails with a transient error is retried up to import_retries times,
+        waiting retry_backoff seconds before the first retry and twice as long before each next one.
+        output_format 'hcl' writes the resources to <target_dir>/<resource_type>.tf, and 'json' writes them to
+        <target_dir>/<resource_type>.tf.json in Terraform's JSON configuration syntax.
+        target_dir is the Terraform working directory all files are written to, 'target' by default.
+        provider_version is the version of the Snowflake provider pinned in providers.tf.
+        plugin_cache_dir, if given, is the Terraform plugin cache used by 'terraform init' (TF_PLUGIN_CACHE_DIR).
+        plugin_dir, if given, is a local directory of providers that 'terraform init' installs from instead of the registry,
+        for runs without network access.
         """
+        if import_mode not in ("auto", "batch", "single"):
+            raise ValueError(f"Invalid import_mode '{import_mode}'. Choose one of ['auto', 'batch', 'single']")
+        if shard_by not in ("hash", "type"):
+            raise ValueError(f"Invalid shard_by '{shard_by}'. Choose one of ['hash', 'type']")
+        if output_format not in ("hcl", "json"):
+            raise ValueError(f"Invalid output_format '{output_format}'. Choose one of ['hcl', 'json']")
+        if shards < 1:
+            raise ValueError(f"Invalid number of shards '{shards}'. It should be at least 1")
+
         self.connector = connector
+        self.import_mode = import_mode
+        self.shards = shards
+        self.shard_by = shard_by
+        self.incremental = incremental
+        self.max_parallelism = max_parallelism
+        self.report = report if report is not None else RunReport()
+        self.import_retries = import_retries
+        self.retry_backoff = retry_backoff
+        self.output_format = output_format
+        self.target_dir = target_dir
+        self.provider_version = provider_version
+        self.plugin_cache_dir = plugin_cache_dir
+        self.plugin_dir = plugin_dir
         self.resource_mapping = {}  # This will hold the mapping between Terraform resource names and cloud IDs
 
         # Define common file paths
-        self.tfstate_file_path = 'target/terraform.tfstate'
-        self.tfvars_file_path = 'target/terraform.tfvars'
-        self.tf_variables_file_path = 'target/variables.tf'
-        self.tf_providers_file_path = 'target/providers.tf'
+        self.tfstate_file_path = os.path.join(target_dir, 'terraform.tfstate')
+        self.snapshot_file_path = os.path.join(target_dir, '.snowglober_snapshot.json')
+        self.import_checkpoint_file_path = os.path.join(target_dir, '.snowglober_import_checkpoint.json')
+        self.import_failures_file_path = os.path.join(target_dir, 'import_failures.json')
+        self.tfvars_file_path = os.path.join(target_dir, 'terraform.tfvars')
+        self.tf_variables_file_path = os.path.join(target_dir, 'variables.tf')
+        self.tf_providers_file_path = os.path.join(target_dir, 'providers.tf')
+        self.tf_lock_file_path = os.path.join(target_dir, '.terraform.lock.hcl')
+        self.init_hash_file_path = os.path.join(target_dir, '.terraform', 'snowglober_init_hash')
+        self.extraction_file_path = os.path.join(target_dir, '.snowglober_extraction.json')
+        self.tf_imports_file_name = 'imports.tf'
+        self.tf_imports_override_file_name = 'imports_override.tf'
+        self.tf_shard_resources_file_name = 'resources.tf.json' if output_format == "json" else 'resources.tf'
 
         # Create target directory if it doesn't exist
-        os.makedirs('target', exist_ok=True)
+        os.makedirs(target_dir, exist_ok=True)
+
+        # Snapshot of the objects extracted by the last run, keyed by Terraform resource name.
+        # It's only used in incremental mode and is None when there is no previous run (or state) to compare with.
+        self.previous_snapshot = None
+        if self.incremental and os.path.exists(self.snapshot_file_path) and os.path.exists(self.tfstate_file_path):
+            with open(self.snapshot_file_path, 'r') as f:
+                self.previous_snapshot = json.load(f)
+        self.snapshot = {}  # This will hold the snapshot of the objects extracted by this run
+        self.unchanged_resource_names = set()  # Resources that are the same as in the previous snapshot
+        self.removed_resource_names = set()  # Resources in the previous snapshot that no longer exist
+        self.import_failures = []  # Resources that couldn't be imported, with the error of their last attempt
+        self._import_failures_lock = threading.Lock()
 
         # Define resources_to_generate as an instance attribute
+        # Resource types with a container are listed once per container (e.g. per database) after their containers.
+        # aggregate, if given, turns the SHOW rows of a container into the objects to generate config for.
         self.resources_to_generate = [
-            {"resource_type": "snowflake_database", "api_call": lambda: self.connector.get_all_objects_of_a_resource_type('databases')},
-            {"resource_type": "snowflake_role", "api_call": lambda: self.connector.get_all_objects_of_a_resource_type('roles')},
-            {"resource_type": "snowflake_user", "api_call": lambda: self.connector.get_all_objects_of_a_resource_type('users')},
-            {"resource_type": "snowflake_warehouse", "api_call": lambda: self.connector.get_all_objects_of_a_resource_type('warehouses')}
+            {"resource_type": "snowflake_database", "entity": "databases"},
+            {"resource_type": "snowflake_role", "entity": "roles"},
+            {"resource_type": "snowflake_user", "entity": "users"},
+            {"resource_type": "snowflake_warehouse", "entity": "warehouses"},
+            {"resource_type": "snowflake_schema", "entity": "schemas", "container": "database"},
+            {"resource_type": "snowflake_role_grants", "entity": "grants", "container": "role", "aggregate": _role_grants_from_show_grants},
+            {"resource_type": "snowflake_stage", "entity": "stages", "container": "schema"},
+            {"resource_type": "snowflake_file_format", "entity": "file formats", "container": "schema"},
+            {"resource_type": "snowflake_sequence", "entity": "sequences", "container": "schema"},
         ]
 
-
-
         # Define valid_properties for each resource type TODO RENAME DICT?
+        # show_columns maps optional properties to the SHOW column they're read from in direct render mode
+        # names_to_ignore holds exact names, glob patterns (e.g. "*_TEMP") and regular expressions prefixed with "re:"
+        # required_columns maps required properties to the SHOW column they're read from when the names differ
+        # id_columns are the SHOW columns making up the import ID, joined with "|" (defaults to ["name"])
         self.valid_properties = {
             "snowflake_database": {
                 "required_properties": ["name"],
@@ -41,11 +205,19 @@ class TerraformConfigGenerator:
                                         "from_replica", "from_share", "is_transient", "replication_configuration",
                                         "from_database", "is_transient",],
                 "names_to_ignore": [],
+                "show_columns": {
+                    "comment": ("comment", _show_value_to_str),
+                    "data_retention_time_in_days": ("retention_time", _show_value_to_int),
+                    "is_transient": ("options", _show_options_to_is_transient),
+                },
             },
             "snowflake_role": {
                 "required_properties": ["name",],
                 "optional_properties": ["comment",],
                 "names_to_ignore": [],
+                "show_columns": {
+                    "comment": ("comment", _show_value_to_str),
+                },
             },
             "snowflake_user": {
                 "required_properties": ["name", "login_name"],
@@ -54,6 +226,19 @@ class TerraformConfigGenerator:
                                         "first_name", "last_name", "must_change_password", 
                                         "password", "rsa_public_key", "rsa_public_key_2", "tag",],
                 "names_to_ignore": ["SNOWFLAKE"],
+                "show_columns": {
+                    "comment": ("comment", _show_value_to_str),
+                    "default_namespace": ("default_namespace", _show_value_to_str),
+                    "default_role": ("default_role", _show_value_to_str),
+                    "default_secondary_roles": ("default_secondary_roles", _show_value_to_list),
+                    "default_warehouse": ("default_warehouse", _show_value_to_str),
+                    "disabled": ("disabled", _show_value_to_bool),
+                    "display_name": ("display_name", _show_value_to_str),
+                    "email": ("email", _show_value_to_str),
+                    "first_name": ("first_name", _show_value_to_str),
+                    "last_name": ("last_name", _show_value_to_str),
+                    "must_change_password": ("must_change_password", _show_value_to_bool),
+                },
             },
             "snowflake_warehouse": {
                 "required_properties": ["name",],
@@ -64,9 +249,86 @@ class TerraformConfigGenerator:
                                         "enable_query_acceleration", "query_acceleration_max_scale_factor",
                                         "warehouse_type",],
                 "names_to_ignore": [],
-            }
+                "show_columns": {
+                    "auto_resume": ("auto_resume", _show_value_to_bool),
+                    "auto_suspend": ("auto_suspend", _show_value_to_int),
+                    "comment": ("comment", _show_value_to_str),
+                    "max_cluster_count": ("max_cluster_count", _show_value_to_int),
+                    "min_cluster_count": ("min_cluster_count", _show_value_to_int),
+                    "resource_monitor": ("resource_monitor", _show_value_to_str),
+                    "scaling_policy": ("scaling_policy", _show_value_to_str),
+                    "warehouse_size": ("size", _show_value_to_upper),
+                    "enable_query_acceleration": ("enable_query_acceleration", _show_value_to_bool),
+                    "query_acceleration_max_scale_factor": ("query_acceleration_max_scale_factor", _show_value_to_int),
+                    "warehouse_type": ("type", _show_value_to_upper),
+                },
+            },
+            "snowflake_schema": {
+                "required_properties": ["database", "name",],
+                "optional_properties": ["comment", "data_retention_days", "is_managed", "is_transient", "tag",],
+                "names_to_ignore": ["INFORMATION_SCHEMA"],
+                "required_columns": {"database": "database_name"},
+                "id_columns": ["database_name", "name"],
+                "show_columns": {
+                    "comment": ("comment", _show_value_to_str),
+                    "data_retention_days": ("retention_time", _show_value_to_int),
+                    "is_managed": ("options", _show_options_to_is_managed),
+                    "is_transient": ("options", _show_options_to_is_transient),
+                },
+            },
+            "snowflake_role_grants": {
+                "required_properties": ["role_name",],
+                "optional_properties": ["roles", "users", "enable_multiple_grants",],
+                "names_to_ignore": [],
+                "required_columns": {"role_name": "name"},
+                "show_columns": {
+                    "roles": ("roles", _show_value_to_list),
+                    "users": ("users", _show_value_to_list),
+                },
+            },
+            "snowflake_stage": {
+                "required_properties": ["name", "database", "schema",],
+                "optional_properties": ["aws_external_id", "comment", "copy_options", "credentials", "directory", "encryption",
+                                        "file_format", "snowflake_iam_user", "storage_integration", "tag", "url",],
+                "names_to_ignore": [],
+                "required_columns": {"database": "database_name", "schema": "schema_name"},
+                "id_columns": ["database_name", "schema_name", "name"],
+                "show_columns": {
+                    "comment": ("comment", _show_value_to_str),
+                    "storage_integration": ("storage_integration", _show_value_to_str),
+                    "url": ("url", _show_value_to_str),
+                },
+            },
+            "snowflake_file_format": {
+                "required_properties": ["name", "database", "schema", "format_type",],
+                "optional_properties": ["binary_format", "comment", "compression", "date_format", "empty_field_as_null",
+                                        "encoding", "error_on_column_count_mismatch", "escape", "escape_unenclosed_field",
+                                        "field_delimiter", "field_optionally_enclosed_by", "file_extension", "null_if",
+                                        "record_delimiter", "skip_blank_lines", "skip_header", "strip_outer_array",
+                                        "strip_outer_element", "time_format", "timestamp_format", "trim_space",],
+                "names_to_ignore": [],
+                "required_columns": {"database": "database_name", "schema": "schema_name", "format_type": "type"},
+                "id_columns": ["database_name", "schema_name", "name"],
+                "show_columns": {
+                    "comment": ("comment", _show_value_to_str),
+                },
+            },
+            "snowflake_sequence": {
+                "required_properties": ["name", "database", "schema",],
+                "optional_properties": ["comment", "increment",],
+                "names_to_ignore": [],
+                "required_columns": {"database": "database_name", "schema": "schema_name"},
+                "id_columns": ["database_name", "schema_name", "name"],
+                "show_columns": {
+                    "comment": ("comment", _show_value_to_str),
+                    "increment": ("interval", _show_value_to_int),
+                },
+            },
         }
 
+        # Compile valid_properties once; every stage uses the compiled schemas
+        self.resource_schemas = compile_resource_schemas(self.valid_properties)
+
     def generate_variables_tf_file(self):
         """
         This method generates the variables.tf file.
@@ -97,26 +359,26 @@ class TerraformConfigGenerator:
     def generate_providers_tf_file(self):
         """
         This method generates the providers.tf file.
-        It hardcodes the Snowflake provider.
+        It hardcodes the Snowflake provider, pinned to self.provider_version.
         """
         print("Generating providers.tf...")
-        config = textwrap.dedent("""\
-        terraform {
-          required_providers {
-            snowflake = {
-              source = "Snowflake-Labs/snowflake"
-            #   version = "3.5.1"
-            }
-          }
-        }
+        config = textwrap.dedent(f"""\
+        terraform {{
+          required_providers {{
+            snowflake = {{
+              source  = "Snowflake-Labs/snowflake"
+              version = {render_string(self.provider_version)}
+            }}
+          }}
+        }}
 
-        provider "snowflake" {
+        provider "snowflake" {{
           account   = var.snowflake_account
           role      = var.snowflake_role
           warehouse = var.snowflake_warehouse
           username  = var.snowflake_username
           password  = var.snowflake_password
-        }
+        }}
         """)
 
         with open(self.tf_providers_file_path, 'w') as f:
@@ -124,10 +386,11 @@ class TerraformConfigGenerator:
 
         print("Generating providers.tf...done")
 
-    def add_missing_environment_variables_to_tfvars_file(self):
+    def add_missing_environment_variables_to_tfvars_file(self, credentials=None):
         """
         This method adds any missing environment variables to the terraform.tfvars file.
-        It takes them from the environment variables.
+        It takes them from credentials, a dictionary keyed by environment variable name (e.g. 'SNOWFLAKE_ACCOUNT'),
+        or from the environment variables if credentials isn't given.
         If there is no terraform.tfvars file, it creates one.
         If there is a terraform.tfvars file, it adds any missing variables to the end of the file.
         If a variable already exists in the file, it is not overwritten.
@@ -142,8 +405,10 @@ class TerraformConfigGenerator:
         }
         
         # Update variables with values from environment variables
+        if credentials is None:
+            credentials = os.environ
         for key in variables:
-            env_value = os.environ.get(key.upper())
+            env_value = credentials.get(key.upper())
             if env_value:
                 variables[key] = env_value
         
@@ -163,7 +428,7 @@ class TerraformConfigGenerator:
         config_lines = []
         for key, value in variables.items():
             if key not in existing_vars:  # Only add variables that are not already in the file
-                config_lines.append(f"{key} = \"{value}\"")
+                config_lines.append(render_attribute(key, value, indent=0).rstrip("\n"))
                 print(f"Added this environment variable to terraform.tfvars (only name shown): " + key)
 
 
@@ -177,99 +442,939 @@ class TerraformConfigGenerator:
         with open(self.tfvars_file_path, 'a') as f:
             f.write("\n" + config)
 
-    def _generate_resource_config_for_all_objects_of_a_resource_type(self, resource_type, get_all_func):
+    def _tf_file_path(self, resource_type, output_format=None):
+        """
+        This method returns the path of the file the resources of a resource type are written to,
+        <target_dir>/<resource_type>.tf or <target_dir>/<resource_type>.tf.json depending on the output format.
+        """
+        extension = ".tf.json" if (output_format or self.output_format) == "json" else ".tf"
+        return os.path.join(self.target_dir, f'{resource_type}{extension}')
+
+    def _hash_resource(self, resource_type, resource):
+        """
+        This method returns a content hash of the SHOW row of a resource.
+        Only the columns the config is generated from are hashed, so that volatile columns
+        such as last_success_login or running don't make a resource look changed.
+        """
+        content = json.dumps({column: resource.get(column) for column in self.resource_schemas[resource_type].hashed_columns}, default=str)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def _generate_resource_config_for_all_objects_of_a_resource_type(self, resource_type, all_resources, include_optional_properties=False):
         """
         This method generates the config for all objects of a given resource type.
-        It uses the get_all_func to get all objects of the given resource type.
-        It then loops through each object and generates the config for it.
-        It adds the config to the self.resources list.
+        It takes all_resources, an iterable of the objects of the given resource type as returned by Snowflake.
+        It then loops through each object and yields the config for it, so objects are processed as they arrive.
         It also adds the resource to the self.resource_mapping dictionary for terraform import.
         It only generates config for objects that are not in the names_to_ignore list.
-        Only required properties for each resource type are added to the config.
+        Only required properties for each resource type are added to the config,
+        unless include_optional_properties is set, in which case the optional properties found in the SHOW columns are added as well.
+        Each object is recorded in self.snapshot. In incremental mode, objects that are unchanged since the previous snapshot
+        are added to self.unchanged_resource_names instead of self.resource_mapping, and objects that are gone are added to self.removed_resource_names.
         """
-        print(f"Querying Snowflake for all {resource_type}s...")
-        all_resources = get_all_func()
-        print(f"Querying Snowflake for all {resource_type}s...done")
-
-        resources = []
+        resource_schema = self.resource_schemas[resource_type]
 
         for resource in all_resources:
 
             # Don't generate config for any resource in names_to_ignore
-            if resource['name'].upper() in map(str.upper, self.valid_properties[resource_type]["names_to_ignore"]):
+            if resource_schema.is_ignored(resource['name']):
                 continue
 
+            # The name is made from the import ID, e.g. 'DB|SCHEMA'. The '|' isn't valid in an identifier,
+            # so objects in containers always get the hash suffix and e.g. RAW_DATA|SALES and RAW|DATA_SALES don't collide.
+            # The snapshot maps the name back to the import ID
+            resource_id = resource_schema.import_id(resource)
             config_resource = {
                 "type": resource_type,
-                "name": resource['name'],
-                "properties": {key: resource[key] for key in self.valid_properties[resource_type]["required_properties"] if key in resource}
+                "name": sanitize_identifier(resource_id),
+                "properties": {key: resource[column] for key, column in resource_schema.required_columns.items() if column in resource}
             }
 
-            resources.append(config_resource)
+            if include_optional_properties:
+                for key, (column, convert) in resource_schema.show_columns.items():
+                    value = convert(resource.get(column))
+                    if value is not None:
+                        config_resource["properties"][key] = value
 
-            # Add to resource mapping for terraform import
             tf_resource_name = f"{config_resource['type']}.{config_resource['name']}"
-            self.resource_mapping[tf_resource_name] = resource['name']  # Assuming the 'name' property of resource is the cloud ID
+            self.snapshot[tf_resource_name] = {"id": resource_id, "hash": self._hash_resource(resource_type, resource)}
+
+            if self.previous_snapshot is not None and self.previous_snapshot.get(tf_resource_name) == self.snapshot[tf_resource_name]:
+                self.unchanged_resource_names.add(tf_resource_name)
+            else:
+                # Add to resource mapping for terraform import
+                self.resource_mapping[tf_resource_name] = resource_id
+
+            yield config_resource
+
+        if self.previous_snapshot is not None:
+            self.removed_resource_names.update(
+                tf_resource_name for tf_resource_name in self.previous_snapshot
+                if tf_resource_name.split(".", 1)[0] == resource_type and tf_resource_name not in self.snapshot)
+
+    def _write_resource_configs_to_tf_file(self, resource_type, config, on_resource=None):
+        """
+        This method writes the config of all resources of a resource type to <target_dir>/<resource_type>.tf (or .tf.json).
+        config is an iterable of resource configs; each one is written as soon as it's generated.
+        on_resource, if given, is called with each resource config after it's written.
+        In incremental mode the existing blocks of unchanged resources are kept as they are,
+        so the optional properties added to them by previous runs aren't lost.
+        The blocks are rendered by the hcl module into a buffer that is written in large chunks,
+        and the file only replaces the previous one once all of it has been written.
+        In the JSON output format each resource is written on its own line of the resource type's object.
+        """
+        tf_file_path = self._tf_file_path(resource_type)
+        print(f'Generating config for {resource_type} at {tf_file_path}...')
+
+        existing_blocks = {}
+        if self.previous_snapshot is not None and os.path.exists(tf_file_path):
+            existing_blocks = self._read_resource_blocks(tf_file_path)
+
+        with HCLFileWriter(tf_file_path) as writer:
+            if self.output_format == "json":
+                writer.write(f'{{"resource": {{{json.dumps(resource_type)}: {{')
+            resources_written = 0
+            for resource in config:
+                tf_resource_name = f"{resource['type']}.{resource['name']}"
+                if tf_resource_name in self.unchanged_resource_names and tf_resource_name in existing_blocks:
+                    block = existing_blocks[tf_resource_name]
+                else:
+                    if tf_resource_name in self.unchanged_resource_names:
+                        # The block is missing from the .tf file, so import the resource again
+                        self.unchanged_resource_names.discard(tf_resource_name)
+                        self.resource_mapping[tf_resource_name] = self.snapshot[tf_resource_name]["id"]
+                    block = None
+                if self.output_format == "json":
+                    properties = block if block is not None else escape_templates(resource["properties"])
+                    writer.write(("," if resources_written else "") + f'\n{json.dumps(resource["name"])}: {json.dumps(properties, default=str)}')
+                elif block is not None:
+                    writer.write(block + "\n")
+                else:
+                    writer.write_block("resource", (resource["type"], resource["name"]), resource["properties"])
+                resources_written += 1
+                if on_resource is not None:
+                    on_resource(resource)
+                self.report.count_objects()
+            if self.output_format == "json":
+                writer.write("\n}}}\n")
+
+        # Terraform would see the resources twice if the file of the other output format were left behind
+        other_tf_file_path = self._tf_file_path(resource_type, "hcl" if self.output_format == "json" else "json")
+        if os.path.exists(other_tf_file_path):
+            os.remove(other_tf_file_path)
+
+        print(f'Generating config for {resource_type} at {tf_file_path}...done')
+
+    def _extract_and_write_resource_type(self, resource_info, include_optional_properties, on_resource, scheduler):
+        """
+        This method streams all objects of a resource type from Snowflake into <target_dir>/<resource_type>.tf.
+        Objects are fetched in batches, filtered and rendered one at a time, so memory use doesn't grow with the number of objects.
+        Resource types with a container are listed with one SHOW query per container, run concurrently by the scheduler.
+        """
+        resource_type = resource_info["resource_type"]
+        entity = resource_info["entity"]
+
+        # Extraction and rendering are interleaved, so the time spent waiting for Snowflake is measured separately
+        with self.report.stage("extract_and_render", resource_type=resource_type, entity=entity) as record:
+            all_resources = self.report.timed_iter(self._iter_all_objects(resource_info, scheduler), record, "extract_time")
+            config = self._generate_resource_config_for_all_objects_of_a_resource_type(resource_type, all_resources, include_optional_properties)
+            self._write_resource_configs_to_tf_file(resource_type, config, on_resource)
+        print(f"Querying Snowflake for all {entity}...done")
 
-        return resources
+    def _iter_all_objects(self, resource_info, scheduler):
+        """
+        This method yields the SHOW rows of all objects of a resource type, in all of its containers if it has any.
+        """
+        if resource_info.get("container") is None:
+            return self.connector.iter_all_objects_of_a_resource_type(resource_info["entity"])
+        return self._iter_all_objects_in_containers(resource_info, scheduler)
+
+    def _get_containers(self, container_kind):
+        """
+        This method returns the containers of a kind found so far, e.g. [('DB', 'SCHEMA'), ...] for schemas.
+        They're the import IDs of the extracted objects of the container's resource type.
+        """
+        container_resource_type = CONTAINER_RESOURCE_TYPES[container_kind]
+        return [tuple(snapshot_entry["id"].split("|")) for tf_resource_name, snapshot_entry in list(self.snapshot.items())
+                if tf_resource_name.split(".", 1)[0] == container_resource_type]
+
+    def _iter_all_objects_in_containers(self, resource_info, scheduler):
+        """
+        This method lists the objects of a resource type in each of its containers concurrently
+        and yields the objects as the queries complete.
+        """
+        entity = resource_info["entity"]
+        aggregate = resource_info.get("aggregate")
+
+        def get_all_objects_in_container(container):
+            all_resources = self.connector.get_all_objects_of_a_resource_type(entity, container)
+            return aggregate(container, all_resources) if aggregate is not None else all_resources
+
+        for _, all_resources in scheduler.map_unordered(get_all_objects_in_container, self._get_containers(resource_info["container"])):
+            yield from all_resources
+
+    def _get_extraction_levels(self):
+        """
+        This method groups self.resources_to_generate into levels that can be extracted concurrently.
+        Account-level resource types are in the first level and every other resource type comes
+        one level after the resource type of its containers (database -> schema -> stage, ...).
+        """
+        resource_types = {resource_info["resource_type"] for resource_info in self.resources_to_generate}
+        levels = {}
+
+        def get_level(resource_info):
+            container_kind = resource_info.get("container")
+            if container_kind is None:
+                return 0
+            container_resource_type = CONTAINER_RESOURCE_TYPES[container_kind]
+            if container_resource_type not in resource_types:
+                raise ValueError(f"{resource_info['resource_type']} needs {container_resource_type} in resources_to_generate")
+            container_info = next(info for info in self.resources_to_generate if info["resource_type"] == container_resource_type)
+            return get_level(container_info) + 1
 
-    def write_resource_configs_to_tf_files(self):
+        for resource_info in self.resources_to_generate:
+            levels.setdefault(get_level(resource_info), []).append(resource_info)
+        return [levels[level] for level in sorted(levels)]
+
+    def _run_extraction_levels(self, extract_resource_type):
         """
-        This method takes the self.resources list and writes the config to the target directory.
+        This method calls extract_resource_type(resource_info, scheduler) for each resource type, level by level.
+        The resource types of a level are extracted concurrently, and their per-container queries share a scheduler
+        running at most self.max_parallelism of them at once.
+        """
+        with ContainerScheduler(self.max_parallelism) as scheduler:
+            for level in self._get_extraction_levels():
+                print(f"Querying Snowflake for all {', '.join(resource_info['entity'] for resource_info in level)}...")
+                with ThreadPoolExecutor(max_workers=len(level)) as executor:
+                    futures = [executor.submit(extract_resource_type, resource_info, scheduler) for resource_info in level]
+                    for future in futures:
+                        future.result()
+
+    def write_resource_configs_to_tf_files(self, include_optional_properties=False, on_resource=None):
+        """
+        This method queries Snowflake for all objects of each resource type and writes their config to the target directory.
         It writes one file per resource type.
         It writes the config in the format that terraform expects.
+        The resource types of each extraction level are extracted concurrently and each object is written to its file as soon as it's fetched,
+        so the first output appears before extraction finishes and memory use stays flat.
+        Per-container queries share a scheduler running at most self.max_parallelism of them at once.
+        on_resource, if given, is called with each resource config after it's written (from the extraction threads).
+        A previous save_extraction no longer matches the files, so it's removed.
         """
-        # Generate config for each resource type and write to file
-        for resource_info in self.resources_to_generate:
-            resource_type = resource_info["resource_type"]
-            api_call = resource_info["api_call"]
+        if os.path.exists(self.extraction_file_path):
+            os.remove(self.extraction_file_path)
+        self._run_extraction_levels(lambda resource_info, scheduler: self._extract_and_write_resource_type(
+            resource_info, include_optional_properties, on_resource, scheduler))
 
-            # Call the new method with the resource type and the function to get the resource
-            config = self._generate_resource_config_for_all_objects_of_a_resource_type(resource_type, api_call)
+        if self.previous_snapshot is not None:
+            print(f"Incremental run: {len(self.resource_mapping)} new or changed, {len(self.unchanged_resource_names)} unchanged "
+                  f"and {len(self.removed_resource_names)} removed resources.")
 
-            print(f'Generating config for {resource_type} at target/{resource_type}.tf...')
-            
-            with open(f'target/{resource_type}.tf', 'w') as f:
+    def read_resource_configs_from_snowflake(self):
+        """
+        This method queries Snowflake for all objects of each resource type, like write_resource_configs_to_tf_files,
+        but returns their configs instead of writing them. It returns a dictionary of Terraform resource name
+        (e.g. 'snowflake_user.AMIR') to the properties a direct render would write.
+        The objects are recorded in self.snapshot as usual. No file is written.
+        """
+        resource_configs = {}
+
+        def read_resource_type(resource_info, scheduler):
+            resource_type = resource_info["resource_type"]
+            with self.report.stage("extract", resource_type=resource_type, entity=resource_info["entity"]):
+                config = self._generate_resource_config_for_all_objects_of_a_resource_type(
+                    resource_type, self._iter_all_objects(resource_info, scheduler), include_optional_properties=True)
                 for resource in config:
-                    f.write("resource \"{}\" \"{}\" {{\n".format(resource["type"], resource["name"]))
-                    for property, value in resource["properties"].items():
-                        f.write("    {} = \"{}\"\n".format(property, value))
-                    f.write("}\n\n")
-            
-            print(f'Generating config for {resource_type} at target/{resource_type}.tf...done')
+                    resource_configs[f"{resource_type}.{resource['name']}"] = resource["properties"]
+                    self.report.count_objects()
+
+        self._run_extraction_levels(read_resource_type)
+        return resource_configs
+
+    def read_resource_configs_from_tf_files(self):
+        """
+        This method reads the resources of the .tf and .tf.json files in the target directory back.
+        It returns a dictionary of Terraform resource name (e.g. 'snowflake_user.AMIR') to the properties the file sets.
+        The values are parsed by the hcl module; a value that isn't a literal, e.g. a reference, is kept as its text.
+        It raises FileNotFoundError if there is no file for any resource type.
+        """
+        resource_configs = {}
+        tf_files_found = False
+        for resource_info in self.resources_to_generate:
+            for output_format in ("hcl", "json"):
+                tf_file_path = self._tf_file_path(resource_info["resource_type"], output_format)
+                if not os.path.exists(tf_file_path):
+                    continue
+                tf_files_found = True
+                for tf_resource_name, block in self._read_resource_blocks(tf_file_path).items():
+                    resource_configs[tf_resource_name] = unescape_templates(block) if output_format == "json" else parse_block_body(block)
+        if not tf_files_found:
+            raise FileNotFoundError(f"No .tf files found in {self.target_dir}")
+        return resource_configs
+
+    def _save_snapshot(self):
+        """
+        This method saves self.snapshot, so that the next incremental run can compare with it.
+        """
+        with open(self.snapshot_file_path, 'w') as f:
+            json.dump(self.snapshot, f)
+
+    def save_extraction(self):
+        """
+        This method saves what write_resource_configs_to_tf_files found out to self.extraction_file_path:
+        the resources to import, the unchanged and removed resources and the snapshot,
+        with the options the files were written with and the previous snapshot an incremental run compared with.
+        load_extraction reads it back, so that import_resources can run in a later process.
+        """
+        with open(self.extraction_file_path, 'w') as f:
+            json.dump({
+                "options": {"incremental": self.incremental, "output_format": self.output_format},
+                "previous_snapshot": self.previous_snapshot,
+                "resource_mapping": self.resource_mapping,
+                "unchanged_resource_names": sorted(self.unchanged_resource_names),
+                "removed_resource_names": sorted(self.removed_resource_names),
+                "snapshot": self.snapshot,
+            }, f)
+
+    def load_extraction(self):
+        """
+        This method loads what save_extraction saved.
+        The options the files were extracted with replace those of this generator, since importing or patching them
+        with other options would go wrong, e.g. a full import of an incremental extraction would start from an empty state
+        and only import the changed resources. A replaced option is printed.
+        It raises FileNotFoundError if nothing was extracted into the target directory yet.
+        """
+        with open(self.extraction_file_path, 'r') as f:
+            extraction = json.load(f)
+        options = extraction["options"]
+        changed_options = [f"{key}={value!r}" for key, value in options.items() if getattr(self, key) != value]
+        if changed_options:
+            print(f"Using the options the resources were extracted with: {', '.join(changed_options)}")
+        self.incremental = options["incremental"]
+        self.output_format = options["output_format"]
+        self.tf_shard_resources_file_name = 'resources.tf.json' if self.output_format == "json" else 'resources.tf'
+        self.previous_snapshot = extraction["previous_snapshot"]
+        self.resource_mapping = extraction["resource_mapping"]
+        self.unchanged_resource_names = set(extraction["unchanged_resource_names"])
+        self.removed_resource_names = set(extraction["removed_resource_names"])
+        self.snapshot = extraction["snapshot"]
+
+    def write_complete_resource_configs_to_tf_files(self, write_state=False):
+        """
+        This method renders complete resources directly from the SHOW output ("direct render" mode).
+        Optional properties are read from the SHOW columns listed in valid_properties' show_columns,
+        so the .tf files are complete without running 'terraform import'.
+        With write_state set, it also writes a matching terraform.tfstate holding the rendered properties;
+        Terraform fills in the remaining attributes on the next refresh.
+        """
+        if not write_state:
+            self.write_resource_configs_to_tf_files(include_optional_properties=True)
+            self._save_snapshot()
+            return
+
+        print(f"Generating {self.tfstate_file_path}...")
+        terraform_version = self._get_terraform_version() or IMPORT_BLOCKS_MIN_TERRAFORM_VERSION
+        state_header = {
+            "version": 4,
+            "terraform_version": ".".join(str(part) for part in terraform_version),
+            "serial": 1,
+            "lineage": str(uuid.uuid4()),
+            "outputs": {},
+        }
+        state_lock = threading.Lock()
+        resources_written = 0
+
+        def write_state_resource(resource):
+            # The state's resources are streamed to the file as they're rendered
+            nonlocal resources_written
+            state_resource = json.dumps(self._tfstate_resource_from_resource_config(resource))
+            with state_lock:
+                f.write((",\n" if resources_written else "\n") + state_resource)
+                resources_written += 1
+
+        with open(self.tfstate_file_path, 'w') as f:
+            f.write(json.dumps(state_header)[:-1] + ', "resources": [')
+            self.write_resource_configs_to_tf_files(include_optional_properties=True, on_resource=write_state_resource)
+            f.write("\n]}\n")
+        print(f"Generating {self.tfstate_file_path}...done")
+
+        self._save_snapshot()
+
+    def _tfstate_resource_from_resource_config(self, resource):
+        """
+        This method returns the terraform.tfstate entry of a resource config.
+        The id of the resource is its import ID from self.snapshot.
+        """
+        resource_id = self.snapshot[f"{resource['type']}.{resource['name']}"]["id"]
+        return {
+            "mode": "managed",
+            "type": resource["type"],
+            "name": resource["name"],
+            "provider": SNOWFLAKE_PROVIDER_ADDRESS,
+            "instances": [{
+                "schema_version": 0,
+                "attributes": {"id": resource_id, **resource["properties"]},
+                "sensitive_attributes": [],
+            }],
+        }
+
+    def _run_terraform(self, args, **kwargs):
+        """
+        This method runs a terraform cli command, raising CalledProcessError if it fails.
+        The time it takes is recorded in self.report.
+        Terraform uses self.plugin_cache_dir as its plugin cache, if it's set.
+        """
+        if self.plugin_cache_dir is not None:
+            kwargs["env"] = {**os.environ, "TF_PLUGIN_CACHE_DIR": os.path.abspath(self.plugin_cache_dir)}
+        start_time = time.perf_counter()
+        try:
+            return subprocess.run(["terraform", *args], check=True, **kwargs)
+        finally:
+            self.report.record_subprocess(time.perf_counter() - start_time)
 
     def run_terraform_init(self):
         """
         This method runs terraform init in the target directory.
+        It's skipped when the directory was already initialized for the same providers.tf and plugin_dir,
+        as recorded in .terraform/ by the last init, and the lock file is still there.
+        The providers are installed from self.plugin_dir instead of the registry if it's set.
+        When the lock file is there but the directory isn't initialized for the current config, e.g. because
+        --provider-version changed, init runs with -upgrade; otherwise Terraform rejects a locked provider
+        version that doesn't match the new constraint.
         """
+        init_hash = self._get_init_hash()
+        if os.path.exists(self.tf_lock_file_path) and os.path.exists(self.init_hash_file_path):
+            with open(self.init_hash_file_path, 'r') as f:
+                if f.read() == init_hash:
+                    with self.report.stage("terraform_init", skipped=True):
+                        print("Terraform is already initialized for this provider config, skipping terraform init.")
+                    return
+
         # Run terraform init
         print("Running terraform init...")
-        subprocess.run(["terraform", "-chdir=target", "init"], check=True)
+        init_args = [f"-chdir={self.target_dir}", "init", "-input=false"]
+        if os.path.exists(self.tf_lock_file_path):
+            init_args.append("-upgrade")
+        if self.plugin_dir is not None:
+            init_args.append(f"-plugin-dir={os.path.abspath(self.plugin_dir)}")
+        if self.plugin_cache_dir is not None:
+            os.makedirs(self.plugin_cache_dir, exist_ok=True)  # Terraform ignores a plugin cache directory that doesn't exist
+        with self.report.stage("terraform_init"), TERRAFORM_INIT_LOCK:
+            self._run_terraform(init_args)
+        os.makedirs(os.path.dirname(self.init_hash_file_path), exist_ok=True)
+        with open(self.init_hash_file_path, 'w') as f:
+            f.write(init_hash)
         print("Running terraform init...done")
 
+    def _get_init_hash(self):
+        """
+        This method returns a hash of everything 'terraform init' depends on: providers.tf and the plugin_dir.
+        """
+        content = ""
+        if os.path.exists(self.tf_providers_file_path):
+            with open(self.tf_providers_file_path, 'r') as f:
+                content = f.read()
+        return hashlib.sha256(json.dumps([content, self.plugin_dir]).encode()).hexdigest()
+
+    def _get_terraform_version(self):
+        """
+        This method returns the installed Terraform version as a tuple of ints, e.g. (1, 5, 7).
+        It returns None if the version can't be determined.
+        """
+        try:
+            result = self._run_terraform(["version", "-json"], capture_output=True, text=True)
+            version = json.loads(result.stdout)["terraform_version"]
+            return tuple(int(part) for part in re.findall(r'\d+', version)[:3])
+        except (OSError, subprocess.CalledProcessError, ValueError, KeyError):
+            return None
+
+    def _resolve_import_mode(self):
+        """
+        This method resolves the 'auto' import mode to 'batch' or 'single'
+        depending on the installed Terraform version.
+        """
+        if self.import_mode != "auto":
+            return self.import_mode
+
+        version = self._get_terraform_version()
+        if version is not None and version >= IMPORT_BLOCKS_MIN_TERRAFORM_VERSION:
+            return "batch"
+        return "single"
+
+    def _write_import_block_files(self, working_dir, resource_mapping, managed_resource_names=()):
+        """
+        This method writes the files needed to import every resource in a single Terraform run.
+        The imports.tf file has one `import {}` block per resource in resource_mapping.
+        The imports_override.tf file sets `ignore_changes = all` on each imported resource and on each
+        resource in managed_resource_names that is already in the state,
+        so that 'terraform apply' only imports the resources and never changes them in Snowflake.
+        """
+        import_lines = []
+        override_lines = []
+        for resource_name, resource_id in resource_mapping.items():
+            import_lines.append("import {\n")
+            import_lines.append(f"    to = {resource_name}\n")
+            import_lines.append(render_attribute("id", resource_id))
+            import_lines.append("}\n\n")
+        for resource_name in [*resource_mapping, *managed_resource_names]:
+            resource_type, name = resource_name.split(".", 1)
+            override_lines.append(f"resource {render_string(resource_type)} {render_string(name)} {{\n")
+            override_lines.append("    lifecycle {\n")
+            override_lines.append("        ignore_changes = all\n")
+            override_lines.append("    }\n")
+            override_lines.append("}\n\n")
+
+        with open(os.path.join(working_dir, self.tf_imports_file_name), 'w') as f:
+            f.writelines(import_lines)
+        with open(os.path.join(working_dir, self.tf_imports_override_file_name), 'w') as f:
+            f.writelines(override_lines)
+
+    def _remove_import_block_files(self, working_dir):
+        """
+        This method removes the files written by _write_import_block_files.
+        """
+        for file_name in (self.tf_imports_file_name, self.tf_imports_override_file_name):
+            file_path = os.path.join(working_dir, file_name)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def _import_resources_in_batch(self, working_dir, resource_mapping, managed_resource_names=()):
+        """
+        This method imports all resources in resource_mapping with a single 'terraform apply'.
+        Terraform starts, loads the provider and logs in to Snowflake only once for all resources.
+        If the apply fails with a transient error, it's retried like a 'terraform import', with import blocks
+        only for the resources that aren't in the state yet. If it fails with any other error, or still fails after
+        its retries, the resources it didn't import are imported one by one,
+        so that a single bad resource doesn't fail the whole batch.
+        """
+        imported_resource_names = set()
+        for attempt in range(self.import_retries + 1):
+            remaining_resource_mapping = {resource_name: resource_id for resource_name, resource_id in resource_mapping.items()
+                                          if resource_name not in imported_resource_names}
+            self._write_import_block_files(working_dir, remaining_resource_mapping, [*managed_resource_names, *imported_resource_names])
+            try:
+                self._run_terraform([f"-chdir={working_dir}", "apply", "-auto-approve", "-input=false"], capture_output=True, text=True)
+                return
+            except subprocess.CalledProcessError as e:
+                error = (e.stderr or e.stdout or str(e)).strip()
+            finally:
+                self._remove_import_block_files(working_dir)
+
+            imported_resource_names = self._get_resource_names_in_state(working_dir) & resource_mapping.keys()
+            if attempt == self.import_retries or not TRANSIENT_ERROR_PATTERN.search(error):
+                break
+            delay = self.retry_backoff * 2 ** attempt
+            print(f"Batch import failed with a transient error, retrying the remaining "
+                  f"{len(resource_mapping) - len(imported_resource_names)} resources in {delay:.0f}s...")
+            time.sleep(delay)
+
+        remaining_resource_mapping = {resource_name: resource_id for resource_name, resource_id in resource_mapping.items()
+                                      if resource_name not in imported_resource_names}
+        print(f"Batch import failed: {error}")
+        print(f"Importing the remaining {len(remaining_resource_mapping)} resources one by one...")
+        self._import_resources_one_by_one(working_dir, remaining_resource_mapping)
+
+    def _import_resource_with_retries(self, working_dir, resource_name, resource_id):
+        """
+        This method runs 'terraform import' for one resource, retrying it when it fails with a transient error.
+        It returns None when the resource was imported, and the error output of the last attempt when it wasn't.
+        """
+        for attempt in range(self.import_retries + 1):
+            try:
+                self._run_terraform([f"-chdir={working_dir}", "import", resource_name, resource_id], capture_output=True, text=True)
+                return None
+            except subprocess.CalledProcessError as e:
+                error = (e.stderr or e.stdout or str(e)).strip()
+                if attempt == self.import_retries or not TRANSIENT_ERROR_PATTERN.search(error):
+                    return error
+                delay = self.retry_backoff * 2 ** attempt
+                print(f"Importing {resource_name} failed with a transient error, retrying in {delay:.0f}s...")
+                time.sleep(delay)
+
+    def _import_resources_one_by_one(self, working_dir, resource_mapping):
+        """
+        This method runs the cli command 'terraform import' for each resource in resource_mapping.
+        It works with any Terraform version but starts Terraform once per resource.
+        Resources that still fail after their retries are added to self.import_failures and skipped.
+        """
+        import_times = []
+        for resource_name, resource_id in resource_mapping.items():
+            start_time = time.perf_counter()
+            error = self._import_resource_with_retries(working_dir, resource_name, resource_id)
+            import_times.append((time.perf_counter() - start_time, resource_name))
+            if error is not None:
+                print(f"Failed to import {resource_name}: {error}")
+                with self._import_failures_lock:
+                    self.import_failures.append({"resource_name": resource_name, "id": resource_id, "error": error})
+        self.report.record_slowest(import_times)
+
+    def _import_resources_into(self, working_dir, resource_mapping, import_mode, managed_resource_names=()):
+        """
+        This method imports the resources in resource_mapping into the state of the given working directory.
+        managed_resource_names are the resources of the working directory's config that are already in its state.
+        """
+        if import_mode == "batch":
+            self._import_resources_in_batch(working_dir, resource_mapping, managed_resource_names)
+        else:
+            self._import_resources_one_by_one(working_dir, resource_mapping)
+
+    def _split_resource_mapping_into_shards(self, resource_mapping):
+        """
+        This method splits resource_mapping into self.shards dictionaries.
+        With shard_by 'type' all resources of a resource type land in the same shard.
+        With shard_by 'hash' resources are spread by a stable hash of their Terraform resource name.
+        Empty shards are dropped.
+        """
+        shards = [{} for _ in range(self.shards)]
+        for resource_name, resource_id in resource_mapping.items():
+            shard_key = resource_name.split(".", 1)[0] if self.shard_by == "type" else resource_name
+            shards[zlib.crc32(shard_key.encode()) % self.shards][resource_name] = resource_id
+        return [shard for shard in shards if shard]
+
+    def _index_resource_blocks(self, tf_file_lines):
+        """
+        This method indexes the resource blocks of a generated .tf file in a single pass over its lines.
+        It returns a dictionary of Terraform resource name (e.g. 'snowflake_user.AMIR') to a tuple of
+        the block's first line number, the line number of its closing bracket and the set of properties it sets.
+        A block ends at the first unindented closing bracket, as written by this class.
+        """
+        blocks = {}
+        resource_name = None
+        for line_num, line in enumerate(tf_file_lines):
+            if resource_name is None:
+                match = RESOURCE_LINE_PATTERN.match(line)
+                if match:
+                    resource_name = f"{match.group(1)}.{match.group(2)}"
+                    start_line_num = line_num
+                    properties = set()
+            elif line.rstrip() == "}":
+                blocks[resource_name] = (start_line_num, line_num, properties)
+                resource_name = None
+            else:
+                match = PROPERTY_LINE_PATTERN.match(line)
+                if match:
+                    properties.add(match.group(1))
+        return blocks
+
+    def _read_resource_blocks(self, tf_file_path):
+        """
+        This method reads a generated .tf file and returns its resource blocks
+        as a dictionary of Terraform resource name (e.g. 'snowflake_user.AMIR') to the block's text.
+        For a .tf.json file the blocks are the dictionaries of the resources' properties.
+        """
+        if tf_file_path.endswith(".json"):
+            with open(tf_file_path, 'r') as f:
+                tf_file_content = json.load(f)
+            return {f"{resource_type}.{name}": properties
+                    for resource_type, resources in tf_file_content.get("resource", {}).items()
+                    for name, properties in resources.items()}
+        with open(tf_file_path, 'r') as f:
+            tf_file_lines = f.readlines()
+        return {resource_name: "".join(tf_file_lines[start_line_num:end_line_num + 1])
+                for resource_name, (start_line_num, end_line_num, _) in self._index_resource_blocks(tf_file_lines).items()}
+
+    def _prepare_shard_directory(self, shard_dir, shard_mapping, resource_blocks):
+        """
+        This method sets up a Terraform working directory for one shard.
+        It copies the provider and variable files, writes the resource blocks of the shard's resources
+        and reuses the providers installed by 'terraform init' in the target directory.
+        """
+        if os.path.exists(shard_dir):
+            shutil.rmtree(shard_dir)
+        os.makedirs(shard_dir)
+
+        for file_path in (self.tf_providers_file_path, self.tf_variables_file_path, self.tfvars_file_path, self.tf_lock_file_path):
+            if os.path.exists(file_path):
+                shutil.copy(file_path, shard_dir)
+
+        with open(os.path.join(shard_dir, self.tf_shard_resources_file_name), 'w') as f:
+            if self.output_format == "json":
+                resources = {}
+                for resource_name in shard_mapping:
+                    resource_type, name = resource_name.split(".", 1)
+                    resources.setdefault(resource_type, {})[name] = resource_blocks[resource_name]
+                json.dump({"resource": resources}, f)
+            else:
+                f.write("\n".join(resource_blocks[resource_name] for resource_name in shard_mapping))
+
+        # Share the installed providers instead of running 'terraform init' per shard
+        terraform_dir = os.path.join(self.target_dir, '.terraform')
+        if os.path.isdir(terraform_dir):
+            os.symlink(os.path.abspath(terraform_dir), os.path.join(shard_dir, '.terraform'))
+        else:
+            self._run_terraform([f"-chdir={shard_dir}", "init"])
+
+    def _merge_shard_states(self, shard_dirs):
+        """
+        This method merges the terraform.tfstate files of the shards into self.tfstate_file_path.
+        The resources already in self.tfstate_file_path (in incremental mode) are kept.
+        """
+        merged_state = None
+        if os.path.exists(self.tfstate_file_path):
+            with open(self.tfstate_file_path, 'r') as f:
+                merged_state = json.load(f)
+            merged_state["serial"] += 1
+        for shard_dir in shard_dirs:
+            shard_state_path = os.path.join(shard_dir, 'terraform.tfstate')
+            if not os.path.exists(shard_state_path):
+                continue
+            with open(shard_state_path, 'r') as f:
+                shard_state = json.load(f)
+            if merged_state is None:
+                merged_state = shard_state
+                merged_state["serial"] = 1
+                merged_state["lineage"] = str(uuid.uuid4())
+            else:
+                merged_state["resources"].extend(shard_state.get("resources", []))
+
+        if merged_state is not None:
+            with open(self.tfstate_file_path, 'w') as f:
+                json.dump(merged_state, f, indent=2)
+
+    def _import_resources_in_shards(self, resource_mapping, import_mode):
+        """
+        This method imports resource_mapping in parallel shards.
+        Each shard is imported in its own <target_dir>/shard_<k>/ working directory with its own state and lock,
+        and the shard states are merged into self.tfstate_file_path afterwards.
+        The work is done by Terraform subprocesses, so a thread pool is enough to keep all of them busy.
+        """
+        resource_blocks = {}
+        for resource_info in self.resources_to_generate:
+            tf_file_path = self._tf_file_path(resource_info["resource_type"])
+            if os.path.exists(tf_file_path):
+                resource_blocks.update(self._read_resource_blocks(tf_file_path))
+
+        shard_mappings = self._split_resource_mapping_into_shards(resource_mapping)
+        shard_dirs = [os.path.join(self.target_dir, f'shard_{k}') for k in range(len(shard_mappings))]
+        for shard_dir, shard_mapping in zip(shard_dirs, shard_mappings):
+            self._prepare_shard_directory(shard_dir, shard_mapping, resource_blocks)
+
+        def import_shard(shard_dir, shard_mapping):
+            with self.report.stage("import_shard", shard=shard_dir, import_mode=import_mode) as record:
+                record["objects"] = len(shard_mapping)
+                self._import_resources_into(shard_dir, shard_mapping, import_mode)
+
+        with ThreadPoolExecutor(max_workers=len(shard_mappings) or 1) as executor:
+            futures = [executor.submit(import_shard, shard_dir, shard_mapping)
+                       for shard_dir, shard_mapping in zip(shard_dirs, shard_mappings)]
+            for future in futures:
+                future.result()
+
+        self._merge_shard_states(shard_dirs)
+
+        for shard_dir in shard_dirs:
+            shutil.rmtree(shard_dir)
+
+    def _get_resource_names_in_state(self, working_dir):
+        """
+        This method returns the set of Terraform resource names in the state of a working directory,
+        like 'terraform state list' but without starting Terraform.
+        """
+        tfstate_file_path = os.path.join(working_dir, 'terraform.tfstate')
+        if not os.path.exists(tfstate_file_path):
+            return set()
+        with open(tfstate_file_path, 'r') as f:
+            tfstate_content = json.load(f)
+        return {f"{resource['type']}.{resource['name']}" for resource in tfstate_content['resources']}
+
+    def _remove_resources_from_state(self, resource_names):
+        """
+        This method runs 'terraform state rm' for the resources in resource_names that are in the state.
+        """
+        resources_in_state = self._get_resource_names_in_state(self.target_dir)
+        resource_names = sorted(resource_name for resource_name in resource_names if resource_name in resources_in_state)
+        if resource_names:
+            print(f"Removing {len(resource_names)} resources from the Terraform state...")
+            with self.report.stage("state_rm") as record:
+                record["objects"] = len(resource_names)
+                self._run_terraform([f"-chdir={self.target_dir}", "state", "rm", *resource_names])
+
     def import_resources(self):
         """
         This method imports the resources into the terraform state.
         It uses the self.resource_mapping dictionary to map the resource name to the cloud ID.
-        It runs the cli command 'terraform import' for each resource.
+        In 'batch' mode it imports all resources in a single Terraform run using `import {}` blocks.
+        In 'single' mode it runs the cli command 'terraform import' for each resource.
+        With more than one shard, the shards are imported in parallel and their states merged.
+        In incremental mode the state is kept: changed and removed resources are removed from it
+        and only the new and changed resources are imported.
+        It prints how long the import took in the chosen mode.
+        While the import runs, a checkpoint file marks it as unfinished. If a run is interrupted, the next run resumes
+        from the state instead of starting from zero: it keeps the resources already imported and only imports the others.
+        Resources that fail to import even after their retries are written to self.import_failures_file_path;
+        the import still counts as finished, so the next run imports them again as usual.
         """
-        # Delete existing .tfstate file if it exists
-        if os.path.exists(self.tfstate_file_path):
+        resources_to_import = self.resource_mapping
+        managed_resource_names = set(self.unchanged_resource_names)
+        if os.path.exists(self.import_checkpoint_file_path):
+            resources_to_import, managed_resource_names = self._resume_import()
+        elif self.previous_snapshot is not None:
+            # Changed resources are removed so that they're imported again with their new properties
+            self._remove_resources_from_state(self.removed_resource_names | set(self.resource_mapping))
+        elif os.path.exists(self.tfstate_file_path):
+            # Delete existing .tfstate file if it exists
             os.remove(self.tfstate_file_path)
             print(f"Deleted existing {self.tfstate_file_path} file.")
 
+        if not resources_to_import:
+            print("No new or changed resources to import.")
+            self._finish_import()
+            return
+
+        import_mode = self._resolve_import_mode()
+        # The hashes tell a resumed run which of the resources imported by this run changed in the meantime
+        with open(self.import_checkpoint_file_path, 'w') as f:
+            json.dump({"import_mode": import_mode, "shards": self.shards, "resources": len(resources_to_import),
+                       "hashes": {resource_name: self.snapshot[resource_name]["hash"] for resource_name in resources_to_import}}, f)
+
         # Import resources into Terraform state
-        print("Importing resources into Terraform state...")
-        for resource_name, resource_id in self.resource_mapping.items():
-            subprocess.run(["terraform", "-chdir=target", "import", resource_name, resource_id], check=True)
+        print(f"Importing resources into Terraform state (import mode: {import_mode}, shards: {self.shards})...")
+        start_time = time.perf_counter()
+        with self.report.stage("import", import_mode=import_mode, shards=self.shards) as record:
+            record["objects"] = len(resources_to_import)
+            if self.shards > 1:
+                self._import_resources_in_shards(resources_to_import, import_mode)
+            else:
+                self._import_resources_into(self.target_dir, resources_to_import, import_mode, managed_resource_names)
+            record["failures"] = len(self.import_failures)
+        elapsed_time = time.perf_counter() - start_time
+        imported = len(resources_to_import) - len(self.import_failures)
+        print(f"Imported {imported} resources in {elapsed_time:.1f}s (import mode: {import_mode}, shards: {self.shards}).")
         print("Importing resources into Terraform state...done")
 
+        self._finish_import()
+
+    def _resume_import(self):
+        """
+        This method prepares resuming an import that didn't finish, as marked by the checkpoint file.
+        It merges the states of shards left behind by the previous run, and removes the resources from the state
+        that aren't in the generated config anymore, or that changed since the previous run imported them.
+        It returns the resources of self.resource_mapping that still need to be imported,
+        and the names of the resources of the config that are already in the state.
+        """
+        with open(self.import_checkpoint_file_path, 'r') as f:
+            imported_hashes = json.load(f).get("hashes", {})
+        print("Resuming the unfinished import of the previous run...")
+        shard_dirs = sorted(glob.glob(os.path.join(self.target_dir, 'shard_*')))
+        if shard_dirs:
+            self._merge_shard_states(shard_dirs)
+            for shard_dir in shard_dirs:
+                shutil.rmtree(shard_dir)
+
+        resources_in_state = self._get_resource_names_in_state(self.target_dir)
+        resources_in_config = self.unchanged_resource_names | set(self.resource_mapping)
+        changed_resource_names = {resource_name for resource_name in resources_in_state & set(self.resource_mapping)
+                                  if imported_hashes.get(resource_name) != self.snapshot[resource_name]["hash"]}
+        self._remove_resources_from_state((resources_in_state - resources_in_config) | changed_resource_names)
+        resources_in_state -= changed_resource_names
+
+        resources_to_import = {resource_name: resource_id for resource_name, resource_id in self.resource_mapping.items()
+                               if resource_name not in resources_in_state}
+        print(f"{len(self.resource_mapping) - len(resources_to_import)} resources are already imported.")
+        return resources_to_import, resources_in_state & resources_in_config
+
+    def _finish_import(self):
+        """
+        This method records the outcome of import_resources. The import is finished, so the checkpoint file is removed.
+        Failures are written to self.import_failures_file_path, and the failed resources are left out of the snapshot,
+        so that the next incremental run imports them again. A run without failures removes the failures file.
+        The checkpoint isn't kept for failures: resuming would keep every resource in the state as it is,
+        so one resource that always fails would stop later runs from refreshing the others.
+        """
+        if self.import_failures:
+            with open(self.import_failures_file_path, 'w') as f:
+                json.dump(self.import_failures, f, indent=2)
+            print(f"{len(self.import_failures)} resources failed to import, see {self.import_failures_file_path}. "
+                  "Run again to retry them.")
+            for failure in self.import_failures:
+                self.snapshot.pop(failure["resource_name"], None)
+        elif os.path.exists(self.import_failures_file_path):
+            os.remove(self.import_failures_file_path)
+        if os.path.exists(self.import_checkpoint_file_path):
+            os.remove(self.import_checkpoint_file_path)
+        self._save_snapshot()
+
+    def _update_tf_file_with_optional_properties(self, resource_type, tf_file_path, state_resources):
+        """
+        This method adds the optional properties of state_resources, the state's resources of a resource type,
+        to the resource blocks of tf_file_path. The file is indexed once and rewritten in a single write.
+        It returns the number of resource blocks found.
+        """
+        with open(tf_file_path, 'r') as f:
+            tf_file_content = f.readlines()
+
+        blocks = self._index_resource_blocks(tf_file_content)
+        optional_properties = self.resource_schemas[resource_type].optional_properties
+
+        # Lines to add before the closing bracket of each block, keyed by the closing bracket's line number
+        lines_to_insert = {}
+
+        for resource in state_resources:
+            for instance in resource['instances']:
+                instance_attributes = instance['attributes']
+
+                block = blocks.get(f"{resource_type}.{resource['name']}")
+                if block is None:
+                    print(f"Could not find resource {resource_type} {resource['name']} in {tf_file_path}. Skipping.")
+                    continue
+                _, resource_end_line_num, existing_properties = block
+
+                # Add each valid property in the .tfstate to the .tf file if it doesn't already exist
+                for key, value in instance_attributes.items():
+                    if key not in optional_properties or key in existing_properties:  # Check if the property is valid and new
+                        continue
+                    if isinstance(value, list) and len(value) == 0:  # Skip properties with empty array as value
+                        continue
+                    lines_to_insert.setdefault(resource_end_line_num, []).append(render_attribute(key, value))
+                    existing_properties.add(key)
+
+        # Build the patched file in one go
+        patched_content = []
+        for line_num, line in enumerate(tf_file_content):
+            patched_content.extend(lines_to_insert.get(line_num, ()))
+            patched_content.append(line)
+
+        with open(tf_file_path, 'w') as f:
+            f.write("".join(patched_content))
+
+        return len(blocks)
+
+    def _update_tf_json_file_with_optional_properties(self, resource_type, tf_file_path, state_resources):
+        """
+        This method adds the optional properties of state_resources, the state's resources of a resource type,
+        to the resources of the .tf.json file tf_file_path. The file is loaded, updated and dumped again,
+        without scanning any lines. It returns the number of resources in the file.
+        """
+        with open(tf_file_path, 'r') as f:
+            tf_file_content = json.load(f)
+
+        resources = tf_file_content.get("resource", {}).get(resource_type, {})
+        optional_properties = self.resource_schemas[resource_type].optional_properties
+
+        for resource in state_resources:
+            properties = resources.get(resource['name'])
+            if properties is None:
+                print(f"Could not find resource {resource_type} {resource['name']} in {tf_file_path}. Skipping.")
+                continue
+            for instance in resource['instances']:
+                for key, value in instance['attributes'].items():
+                    if key not in optional_properties or key in properties:  # Check if the property is valid and new
+                        continue
+                    if isinstance(value, list) and len(value) == 0:  # Skip properties with empty array as value
+                        continue
+                    properties[key] = escape_templates(value)
+
+        with open(tf_file_path, 'w') as f:
+            json.dump(tf_file_content, f, indent=2)
+
+        return len(resources)
+
     def update_tf_files_with_optional_properties(self):
         """
         This method updates the .tf files with optional properties.
         It uses the .tfstate file to get the optional properties.
         It only updates the properties that are not already in the .tf file.
-        It only considers properties that are in the self.valid_properties dictionary.
+        It only considers the optional properties of the resource type's schema in self.resource_schemas.
+        Each .tf file is indexed once and rewritten in a single write, so the time taken grows linearly with the number of resources.
         """
         # Check if .tfstate file exists
         if not os.path.exists(self.tfstate_file_path):
@@ -282,54 +1387,25 @@ class TerraformConfigGenerator:
         with open(self.tfstate_file_path, 'r') as f:
             tfstate_content = json.load(f)
 
+        # Group the state's resources by resource type
+        state_resources_by_type = {}
+        for resource in tfstate_content['resources']:
+            state_resources_by_type.setdefault(resource['type'], []).append(resource)
+
         # Loop through each resource type
         for resource_info in self.resources_to_generate:
-            
+
             resource_type = resource_info["resource_type"]
 
-            tf_file_path = f'target/{resource_type}.tf'
+            tf_file_path = self._tf_file_path(resource_type)
 
             if not os.path.exists(tf_file_path):
                 print(f'No .tf file found for {resource_type}. Skipping.')
                 continue
 
-            with open(tf_file_path, 'r') as f:
-                tf_file_content = f.readlines()
-
-            for resource in tfstate_content['resources']:
-                if resource_info["resource_type"] == resource['type']:
-                    for instance in resource['instances']:
-                        instance_attributes = instance['attributes']
-
-                        # Use regular expressions to match the resource line in the .tf file.
-                        resource_type = resource['type']
-                        resource_line_num = next((i for i, line in enumerate(tf_file_content) if re.match(f'resource "{resource_type}" "{instance_attributes["name"]}" {{', line.strip())), None)
-                        
-                        if resource_line_num is None:
-                            print(f"Could not find resource {resource['type']} {instance_attributes['name']} in {tf_file_path}. Skipping.")
-                            continue
-
-                        # Find the line number of the closing bracket for this resource
-                        resource_end_line_num = next((i for i, line in enumerate(tf_file_content[resource_line_num+1:], start=resource_line_num+1) if '}' in line), len(tf_file_content))
-
-                        # Loop through each property in the .tfstate and add it to the .tf file if it doesn't already exist
-                        for key, value in instance_attributes.items():
-                            if key not in self.valid_properties.get(resource_type, {}).get('optional_properties', []):  # Check if the property is valid
-                                continue
-                            if isinstance(value, list) and len(value) == 0:  # Skip properties with empty array as value
-                                continue
-                            if not any(key in line for line in tf_file_content[resource_line_num:resource_end_line_num]):
-                                if value is None:
-                                    tf_file_content.insert(resource_end_line_num, f'    {key} = null\n')
-                                elif isinstance(value, bool):
-                                    tf_file_content.insert(resource_end_line_num, f'    {key} = {str(value).lower()}\n')  # no quotes around boolean values
-                                elif isinstance(value, list):
-                                    tf_file_content.insert(resource_end_line_num, f'    {key} = {value}\n')  # no quotes around array values
-                                else:
-                                    tf_file_content.insert(resource_end_line_num, f'    {key} = "{value}"\n')
-                                resource_end_line_num += 1  # increment the end line num to keep up with the added lines
-
-            with open(tf_file_path, 'w') as f:
-                f.writelines(tf_file_content)
-
-        print("Updating .tf files with optional properties...done")
\ No newline at end of file
+            update_tf_file = (self._update_tf_json_file_with_optional_properties if self.output_format == "json"
+                              else self._update_tf_file_with_optional_properties)
+            with self.report.stage("patch", resource_type=resource_type) as record:
+                record["objects"] = update_tf_file(resource_type, tf_file_path, state_resources_by_type.get(resource_type, []))
+
+        print("Updating .tf files with optional properties...done")
@@ -0,0 +1,315 @@
+import hashlib
+import os
+import re
+
+# Pattern matching a valid HCL identifier, e.g. the name label of a resource block or a bare object key
+IDENTIFIER_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_-]*\Z')
+
+# Characters that aren't allowed in an identifier
+INVALID_IDENTIFIER_CHARS_PATTERN = re.compile(r'[^A-Za-z0-9_-]')
+
+# Escape sequences of a quoted string; '${' and '%{' would otherwise start an interpolation or a directive
+STRING_ESCAPES = {
+    '\\': '\\\\',
+    '"': '\\"',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\t': '\\t',
+    '${': '$${',
+    '%{': '%%{',
+}
+STRING_ESCAPE_PATTERN = re.compile(r'\\|"|\n|\r|\t|\$\{|%\{')
+STRING_UNESCAPES = {escaped: char for char, escaped in STRING_ESCAPES.items()}
+STRING_UNESCAPE_PATTERN = re.compile(r'\\[\\"nrt]|\$\$\{|%%\{')
+
+# Patterns of the tokens read by parse_value and parse_block_body
+STRING_LITERAL_PATTERN = re.compile(r'"((?:[^"\\\n]|\\.)*)"')
+NUMBER_PATTERN = re.compile(r'-?[0-9]+(\.[0-9]+)?([eE][+-]?[0-9]+)?')
+KEY_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_-]*')
+KEYWORDS = {"true": True, "false": False, "null": None}
+
+INDENT = "    "
+
+
+def sanitize_identifier(name):
+    """
+    This function turns a name into a valid HCL identifier.
+    Valid identifiers are returned as they are. Otherwise the invalid characters are replaced with '_',
+    a leading digit or dash gets a '_' prefix, and a short hash of the name is appended,
+    so that e.g. 'MY.DB' and 'MY DB' don't end up with the same identifier. The result only depends on the name.
+    """
+    name = str(name)
+    if IDENTIFIER_PATTERN.match(name):
+        return name
+    identifier = INVALID_IDENTIFIER_CHARS_PATTERN.sub("_", name)
+    if not identifier or not (identifier[0].isalpha() or identifier[0] == "_"):
+        identifier = "_" + identifier
+    return f"{identifier}_{hashlib.sha1(name.encode()).hexdigest()[:8]}"
+
+
+def escape_string(value):
+    """
+    This function escapes a string for use inside a quoted HCL string.
+    """
+    return STRING_ESCAPE_PATTERN.sub(lambda match: STRING_ESCAPES[match.group(0)], value)
+
+
+def unescape_string(value):
+    """
+    This function reverses escape_string.
+    """
+    return STRING_UNESCAPE_PATTERN.sub(lambda match: STRING_UNESCAPES[match.group(0)], value)
+
+
+def render_string(value):
+    """
+    This function renders a quoted HCL string.
+    """
+    return f'"{escape_string(value)}"'
+
+
+def escape_templates(value):
+    """
+    This function prepares a value for Terraform's JSON configuration syntax, where strings are templates too:
+    '${' and '%{' are escaped in every string of the value, including the strings in lists and dictionaries.
+    """
+    if isinstance(value, str):
+        return value.replace("${", "$${").replace("%{", "%%{")
+    if isinstance(value, (list, tuple)):
+        return [escape_templates(item) for item in value]
+    if isinstance(value, dict):
+        return {key: escape_templates(item) for key, item in value.items()}
+    return value
+
+
+def unescape_templates(value):
+    """
+    This function reverses escape_templates.
+    """
+    if isinstance(value, str):
+        return value.replace("$${", "${").replace("%%{", "%{")
+    if isinstance(value, (list, tuple)):
+        return [unescape_templates(item) for item in value]
+    if isinstance(value, dict):
+        return {key: unescape_templates(item) for key, item in value.items()}
+    return value
+
+
+def render_value(value, indent=1):
+    """
+    This function renders a Python value as an HCL expression.
+    None becomes null, booleans and numbers are written unquoted, lists and tuples become tuples,
+    dictionaries become objects (one attribute per line, indented one level deeper than indent)
+    and anything else is written as a quoted string.
+    """
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(render_value(item, indent) for item in value) + "]"
+    if isinstance(value, dict):
+        if not value:
+            return "{}"
+        lines = ["{\n"]
+        for key, item in value.items():
+            key = str(key)
+            rendered_key = key if IDENTIFIER_PATTERN.match(key) else render_string(key)
+            lines.append(f"{INDENT * (indent + 1)}{rendered_key} = {render_value(item, indent + 1)}\n")
+        lines.append(f"{INDENT * indent}}}")
+        return "".join(lines)
+    return render_string(str(value))
+
+
+def render_attribute(key, value, indent=1):
+    """
+    This function renders an attribute line, e.g. '    comment = "Hello"\\n'.
+    """
+    return f"{INDENT * indent}{key} = {render_value(value, indent)}\n"
+
+
+def render_block(block_type, labels, attributes):
+    """
+    This function renders a top-level block with quoted labels, such as a resource block, followed by a blank line.
+    attributes is a dictionary of attribute names to values.
+    """
+    header = " ".join([block_type, *(render_string(str(label)) for label in labels)])
+    lines = [f"{header} {{\n"]
+    lines.extend(render_attribute(key, value) for key, value in attributes.items())
+    lines.append("}\n\n")
+    return "".join(lines)
+
+
+def _skip_whitespace(text, pos):
+    """
+    This function returns the position of the next token in text, skipping whitespace and comments.
+    """
+    while pos < len(text):
+        if text[pos].isspace():
+            pos += 1
+        elif text[pos] == "#" or text.startswith("//", pos):
+            end = text.find("\n", pos)
+            pos = len(text) if end == -1 else end + 1
+        else:
+            break
+    return pos
+
+
+def _parse_key(text, pos):
+    """
+    This function parses an attribute name or object key, bare or quoted, and returns it with the position after it.
+    """
+    match = STRING_LITERAL_PATTERN.match(text, pos) or KEY_PATTERN.match(text, pos)
+    if match is None:
+        raise ValueError(f"Expected a name at position {pos}")
+    key = unescape_string(match.group(1)) if match.group(0).startswith('"') else match.group(0)
+    return key, match.end()
+
+
+def _parse_body(text, pos, end_char, keep_expressions=False):
+    """
+    This function parses 'key = value' attributes and nested blocks up to end_char, which is consumed.
+    Attributes may be separated by newlines or commas. It returns a dictionary and the position after end_char.
+    With keep_expressions set, an attribute whose value isn't a literal is kept as the text of its expression,
+    up to the end of the line.
+    """
+    body = {}
+    while True:
+        pos = _skip_whitespace(text, pos)
+        if pos >= len(text):
+            raise ValueError(f"Expected '{end_char}' at the end of the text")
+        if text[pos] == end_char:
+            return body, pos + 1
+        key, pos = _parse_key(text, pos)
+        pos = _skip_whitespace(text, pos)
+        if text.startswith("{", pos):  # a nested block such as lifecycle { ... }
+            body[key], pos = _parse_body(text, pos + 1, "}", keep_expressions)
+            continue
+        if not text.startswith(("=", ":"), pos):
+            raise ValueError(f"Expected '=' after '{key}' at position {pos}")
+        try:
+            body[key], pos = parse_value(text, pos + 1)
+        except ValueError:
+            if not keep_expressions:
+                raise
+            end = text.find("\n", pos)
+            end = len(text) if end == -1 else end
+            body[key], pos = text[pos + 1:end].strip(), end
+        pos = _skip_whitespace(text, pos)
+        if text.startswith(",", pos):
+            pos += 1
+
+
+def parse_value(text, pos=0):
+    """
+    This function parses an HCL expression as written by render_value, starting at position pos of text.
+    It returns the Python value and the position after the expression.
+    It raises ValueError for anything else, e.g. references or function calls.
+    """
+    pos = _skip_whitespace(text, pos)
+    if text.startswith("[", pos):
+        items = []
+        pos = _skip_whitespace(text, pos + 1)
+        while not text.startswith("]", pos):
+            item, pos = parse_value(text, pos)
+            items.append(item)
+            pos = _skip_whitespace(text, pos)
+            if text.startswith(",", pos):
+                pos = _skip_whitespace(text, pos + 1)
+            elif not text.startswith("]", pos):
+                raise ValueError(f"Expected ',' or ']' at position {pos}")
+        return items, pos + 1
+    if text.startswith("{", pos):
+        return _parse_body(text, pos + 1, "}")
+    match = STRING_LITERAL_PATTERN.match(text, pos)
+    if match is not None:
+        return unescape_string(match.group(1)), match.end()
+    match = NUMBER_PATTERN.match(text, pos)
+    if match is not None:
+        number = match.group(0)
+        return (float(number) if match.group(1) or match.group(2) else int(number)), match.end()
+    match = KEY_PATTERN.match(text, pos)
+    if match is not None and match.group(0) in KEYWORDS:
+        return KEYWORDS[match.group(0)], match.end()
+    raise ValueError(f"Unsupported expression at position {pos}")
+
+
+def parse_block_body(block):
+    """
+    This function parses the attributes of a block as written by render_block, e.g. a resource block of a .tf file,
+    into a dictionary. Nested blocks become dictionaries too.
+    An attribute whose value isn't a literal, e.g. 'comment = var.comment', is kept as the text of its expression.
+    """
+    pos = block.find("{")
+    if pos == -1:
+        raise ValueError("Expected a block")
+    return _parse_body(block, pos + 1, "}", keep_expressions=True)[0]
+
+
+class HCLFileWriter:
+    """
+    This class builds a file in memory and writes it in a few large chunks instead of one write per block.
+    The file is written to a temporary path and only replaces file_path when it's closed without an error,
+    so an interrupted run never leaves a half-written file behind.
+    """
+
+    def __init__(self, file_path, flush_size=1 << 20):
+        """
+        This method opens the temporary file. The buffer is written to it once it holds flush_size characters.
+        """
+        self.file_path = file_path
+        self.tmp_file_path = f"{file_path}.{os.getpid()}.tmp"
+        self.flush_size = flush_size
+        self._buffer = []
+        self._buffered_size = 0
+        self._file = open(self.tmp_file_path, 'w')
+
+    def write(self, text):
+        """
+        This method adds text to the buffer.
+        """
+        self._buffer.append(text)
+        self._buffered_size += len(text)
+        if self._buffered_size >= self.flush_size:
+            self.flush()
+
+    def write_block(self, block_type, labels, attributes):
+        """
+        This method adds a block rendered by render_block to the buffer.
+        """
+        self.write(render_block(block_type, labels, attributes))
+
+    def flush(self):
+        """
+        This method writes the buffer to the temporary file.
+        """
+        if self._buffer:
+            self._file.write("".join(self._buffer))
+            self._buffer = []
+            self._buffered_size = 0
+
+    def close(self):
+        """
+        This method writes the rest of the buffer and moves the file into place.
+        """
+        self.flush()
+        self._file.close()
+        os.replace(self.tmp_file_path, self.file_path)
+
+    def abort(self):
+        """
+        This method discards the file, leaving any previous version of file_path as it was.
+        """
+        self._file.close()
+        os.remove(self.tmp_file_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,201 @@
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def _peak_memory_mb():
+    """
+    This function returns the peak resident memory of this process and of its finished subprocesses (e.g. terraform) in MB.
+    It returns None where the resource module isn't available.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "subprocesses": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+class RunReport:
+    """
+    This class records timings, object counts, subprocess time and peak memory for the stages of a run.
+    Stages can be opened from several threads at once; subprocess time and object counts are
+    attributed to the stages open in the calling thread.
+    """
+
+    def __init__(self):
+        """
+        This method starts the report's clock.
+        """
+        self.started_at = datetime.now(timezone.utc)
+        self._start_time = time.perf_counter()
+        self.stages = []
+        self.subprocess_time = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _open_stages(self):
+        """
+        This method returns the stack of stages open in the calling thread.
+        """
+        if not hasattr(self._local, "stages"):
+            self._local.stages = []
+        return self._local.stages
+
+    @contextmanager
+    def stage(self, name, **labels):
+        """
+        This method times a stage of the run, e.g. `with report.stage("import", mode="batch"):`.
+        It yields the stage's record, a dictionary that can be annotated with extra measurements.
+        The record is added to the report when the stage ends, also when it fails.
+        """
+        record = {"stage": name, **labels, "objects": 0, "subprocesses": 0, "subprocess_time": 0.0}
+        open_stages = self._open_stages()
+        open_stages.append(record)
+        start_time = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record["failed"] = True
+            raise
+        finally:
+            record["wall_time"] = round(time.perf_counter() - start_time, 3)
+            record["subprocess_time"] = round(record["subprocess_time"], 3)
+            record["peak_memory_mb"] = _peak_memory_mb()
+            open_stages.pop()
+            with self._lock:
+                self.stages.append(record)
+
+    def count_objects(self, count=1):
+        """
+        This method adds to the object count of the innermost stage open in the calling thread.
+        """
+        open_stages = self._open_stages()
+        if open_stages:
+            open_stages[-1]["objects"] += count
+
+    def record_subprocess(self, seconds):
+        """
+        This method adds a finished subprocess to every stage open in the calling thread.
+        """
+        for record in self._open_stages():
+            record["subprocesses"] += 1
+            record["subprocess_time"] += seconds
+        with self._lock:
+            self.subprocess_time += seconds
+
+    def record_slowest(self, timings, count=10):
+        """
+        This method adds the count slowest of timings, a list of (seconds, name) tuples,
+        to the innermost stage open in the calling thread.
+        """
+        open_stages = self._open_stages()
+        if open_stages:
+            open_stages[-1]["slowest"] = [{"name": name, "seconds": round(seconds, 3)} for seconds, name in sorted(timings, reverse=True)[:count]]
+
+    def timed_iter(self, iterable, record, key):
+        """
+        This method yields the items of iterable and adds the time spent waiting for them to record[key],
+        e.g. to separate the time spent fetching rows from Snowflake from the time spent rendering them.
+        """
+        record.setdefault(key, 0.0)
+        iterator = iter(iterable)
+        while True:
+            start_time = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                record[key] = round(record[key] + time.perf_counter() - start_time, 3)
+                return
+            record[key] += time.perf_counter() - start_time
+            yield item
+
+    def as_dict(self):
+        """
+        This method returns the report as a JSON-serialisable dictionary.
+        """
+        with self._lock:
+            stages = list(self.stages)
+        return {
+            "started_at": self.started_at.isoformat(),
+            "wall_time": round(time.perf_counter() - self._start_time, 3),
+            "subprocess_time": round(self.subprocess_time, 3),
+            "peak_memory_mb": _peak_memory_mb(),
+            "stages": stages,
+        }
+
+    def write(self, file_path):
+        """
+        This method writes the report to a JSON file.
+        """
+        with open(file_path, 'w') as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+
+class ThreadedProfiler:
+    """
+    This class profiles a call with cProfile, including the threads it starts, e.g. the extraction threads.
+    Before Python 3.12, cProfile only profiles the thread it's enabled in, so every thread started during the call
+    gets a profiler of its own, and their stats are merged with those of the calling thread.
+    From Python 3.12 cProfile is built on sys.monitoring, and the profiler of the calling thread covers every thread.
+    cProfile and pstats are only imported when a profiler is created, to keep the start-up of the command short.
+    """
+
+    def __init__(self):
+        """
+        This method sets up the profiler of the calling thread.
+        """
+        import cProfile
+        self._profile_class = cProfile.Profile
+        self.profilers = [cProfile.Profile()]
+        self._lock = threading.Lock()
+
+    def _profile_thread(self, frame, event, arg):
+        # Installed by threading.setprofile, so called once at the start of every new thread;
+        # enabling the thread's profiler replaces this function for the rest of the thread
+        profiler = self._profile_class()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is already active; don't try again on every call of the thread
+            sys.setprofile(None)
+            return
+        with self._lock:
+            self.profilers.append(profiler)
+
+    def runcall(self, func, *args, **kwargs):
+        """
+        This method calls func(*args, **kwargs) while profiling it and the threads it starts, and returns its result.
+        """
+        if sys.version_info >= (3, 12):
+            return self.profilers[0].runcall(func, *args, **kwargs)
+        threading.setprofile(self._profile_thread)
+        try:
+            return self.profilers[0].runcall(func, *args, **kwargs)
+        finally:
+            threading.setprofile(None)
+
+    def stats(self):
+        """
+        This method returns the merged stats of all threads as a pstats.Stats.
+        """
+        import pstats
+        with self._lock:
+            profilers = list(self.profilers)
+        for profiler in profilers:
+            profiler.disable()
+        return pstats.Stats(*profilers)
+
+    def dump_stats(self, file_path):
+        """
+        This method writes the merged stats of all threads to file_path, for e.g. snakeviz or pstats.
+        """
+        self.stats().dump_stats(file_path)
@@ -1,25 +1,195 @@
 # bootstrapping file; the orchestrator of the application
 
+import argparse
+import os
+
+from snowglober.accounts import load_accounts_config, print_summary, run_accounts
+from snowglober.instrumentation import RunReport, ThreadedProfiler
+from snowglober.metadata_cache import MetadataCache
 from snowglober.snowflake_connector import SnowflakeConnector
-from generate_tf_config import TerraformConfigGenerator
+from snowglober.generate_tf_config import SNOWFLAKE_PROVIDER_VERSION, TerraformConfigGenerator
+
+TARGET_DIR = 'target'
+RUN_REPORT_FILE_NAME = 'run_report.json'
+PROFILE_FILE_NAME = 'profile.pstats'
+CACHE_DIR_NAME = '.cache'
+DEFAULT_PLUGIN_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.terraform.d', 'plugin-cache')
+
+def add_generator_arguments(parser):
+    """
+    This function adds the arguments that configure the TerraformConfigGenerator to parser.
+    """
+    parser.add_argument("--target-dir", default=TARGET_DIR,
+                        help="Terraform working directory all files are written to (default target).")
+    parser.add_argument("--import-mode", choices=["auto", "batch", "single"], default="auto",
+                        help="'batch' imports all resources in one Terraform run (Terraform 1.5+), "
+                             "'single' runs 'terraform import' per resource, 'auto' picks based on the Terraform version.")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Split the import into this many shards, imported in parallel in their own working directories.")
+    parser.add_argument("--shard-by", choices=["hash", "type"], default="hash",
+                        help="Split shards by a hash of the resource name or by resource type.")
+    parser.add_argument("--output-format", choices=["hcl", "json"], default="hcl",
+                        help="Write the resources to target/<resource_type>.tf (hcl) or to target/<resource_type>.tf.json (json).")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only rewrite and import the objects that changed since the last run, and remove dropped objects from the state.")
+    parser.add_argument("--import-retries", type=int, default=3,
+                        help="Retry a 'terraform import' that fails with a transient error this many times, with exponential backoff.")
+    parser.add_argument("--max-parallelism", type=int, default=8,
+                        help="Maximum number of concurrent SHOW queries, e.g. when listing the schemas of every database.")
+    parser.add_argument("--provider-version", default=SNOWFLAKE_PROVIDER_VERSION,
+                        help=f"Version of the Snowflake provider pinned in providers.tf (default {SNOWFLAKE_PROVIDER_VERSION}).")
+    parser.add_argument("--plugin-cache-dir",
+                        help="Terraform plugin cache shared by all runs (default $TF_PLUGIN_CACHE_DIR or ~/.terraform.d/plugin-cache). "
+                             "With --accounts-config the config's plugin_cache_dir is used instead.")
+    parser.add_argument("--plugin-dir",
+                        help="Install the providers from this local mirror directory instead of the registry, e.g. on runners without network access.")
+
+def add_cache_arguments(parser, default_ttl=3600):
+    """
+    This function adds the arguments of the metadata cache to parser.
+    """
+    parser.add_argument("--cache-ttl", type=int, default=default_ttl,
+                        help=f"Reuse SHOW results cached in target/.cache for this many seconds, 0 disables the cache (default {default_ttl}).")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ignore the cached SHOW results and query Snowflake again, refreshing the cache.")
+    parser.add_argument("--clear-cache", action="store_true",
+                        help="Remove all cached SHOW results before running.")
+
+def parse_args(argv=None):
+    """
+    This function parses the command line arguments of the application.
+    """
+    parser = argparse.ArgumentParser(description="Export Snowflake resources to Terraform configs.")
+    add_generator_arguments(parser)
+    add_cache_arguments(parser)
+    parser.add_argument("--direct-render", action="store_true",
+                        help="Render complete resources directly from the SHOW output, without running 'terraform import'.")
+    parser.add_argument("--write-state", action="store_true",
+                        help="With --direct-render, also write a matching terraform.tfstate.")
+    parser.add_argument("--accounts-config",
+                        help="Export every account listed in this JSON file, each to <output_dir>/<name>, instead of the account of the SNOWFLAKE_* environment variables.")
+    parser.add_argument("--max-accounts", type=int,
+                        help="With --accounts-config, the maximum number of accounts exported at once (the config's max_workers by default).")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile the run with cProfile and write the stats to target/profile.pstats.")
+    return parser.parse_args(argv)
+
+def make_connector(args, report, target_dir, credentials=None):
+    """
+    This function creates the SnowflakeConnector of a run, with a metadata cache in target_dir unless it's disabled.
+    """
+    cache = None
+    if args.cache_ttl > 0 or args.clear_cache:
+        cache_dir = os.path.join(target_dir, CACHE_DIR_NAME)
+        cache = MetadataCache(cache_dir, ttl=args.cache_ttl, refresh=args.refresh)
+        if args.clear_cache:
+            print(f"Removed {cache.invalidate()} cached results from {cache_dir}.")
+        if args.cache_ttl <= 0:
+            cache = None
+    with report.stage("connect"):
+        return SnowflakeConnector(max_connections=args.max_parallelism, cache=cache, credentials=credentials)
+
+def make_generator(args, connector, report, target_dir, plugin_cache_dir=None):
+    """
+    This function creates the TerraformConfigGenerator of a run from the arguments added by add_generator_arguments.
+    connector can be None for the steps that don't query Snowflake.
+    plugin_cache_dir, if given, is the Terraform plugin cache, e.g. the one shared by the accounts of a multi-account run.
+    Otherwise it's --plugin-cache-dir, $TF_PLUGIN_CACHE_DIR or ~/.terraform.d/plugin-cache.
+    """
+    plugin_cache_dir = plugin_cache_dir or args.plugin_cache_dir or os.environ.get('TF_PLUGIN_CACHE_DIR') or DEFAULT_PLUGIN_CACHE_DIR
+    return TerraformConfigGenerator(connector, import_mode=args.import_mode, shards=args.shards, shard_by=args.shard_by,
+                                    incremental=args.incremental, max_parallelism=args.max_parallelism, report=report,
+                                    import_retries=args.import_retries, output_format=args.output_format,
+                                    target_dir=target_dir, provider_version=args.provider_version,
+                                    plugin_cache_dir=plugin_cache_dir, plugin_dir=args.plugin_dir)
 
-def main():
+def run(args, report, target_dir=None, credentials=None, plugin_cache_dir=None):
+    """
+    This function runs the stages of the application for one account, recording them in report.
+    All files are written to target_dir (args.target_dir by default).
+    credentials, if given, are used instead of the SNOWFLAKE_* environment variables.
+    plugin_cache_dir, if given, is the Terraform plugin cache used instead of --plugin-cache-dir.
+    It returns the TerraformConfigGenerator of the run.
+    """
+    target_dir = target_dir or args.target_dir
+    connector = make_connector(args, report, target_dir, credentials)
+    generator = make_generator(args, connector, report, target_dir, plugin_cache_dir)
+    with report.stage("setup_files"):
+        generator.generate_variables_tf_file()
+        generator.generate_providers_tf_file()
+        generator.add_missing_environment_variables_to_tfvars_file(credentials)
+    if args.direct_render:
+        generator.write_complete_resource_configs_to_tf_files(write_state=args.write_state)
+        return generator
+    generator.write_resource_configs_to_tf_files()
+    generator.run_terraform_init()
+    generator.import_resources()
+    generator.update_tf_files_with_optional_properties()
+    return generator
+
+def run_account(args, name, target_dir, credentials, plugin_cache_dir):
+    """
+    This function runs the application for one account of a multi-account run,
+    using the plugin cache shared by all accounts.
+    The account's run report is written to <target_dir>/run_report.json, and the figures
+    for the consolidated summary are returned. Nothing is imported in direct render mode.
+    """
+    report = RunReport()
+    try:
+        with report.stage("run", account=name):
+            generator = run(args, report, target_dir, credentials, plugin_cache_dir)
+    finally:
+        os.makedirs(target_dir, exist_ok=True)
+        report.write(os.path.join(target_dir, RUN_REPORT_FILE_NAME))
+    return {
+        "objects": len(generator.snapshot),
+        "imported": 0 if args.direct_render else len(generator.resource_mapping) - len(generator.import_failures),
+        "import_failures": len(generator.import_failures),
+    }
+
+def main_accounts(args):
+    """
+    This function exports every account of args.accounts_config in parallel and prints a consolidated summary.
+    It raises SystemExit with status 1 if any account failed.
+    """
+    config = load_accounts_config(args.accounts_config)
+    summaries = run_accounts(config, lambda *account_args: run_account(args, *account_args), max_workers=args.max_accounts)
+    print_summary(summaries)
+    if any(summary["status"] == "failed" for summary in summaries):
+        raise SystemExit(1)
+
+def main(argv=None):
     """
     This function is the main entry point for the application.
     It instantiates the SnowflakeConnector and TerraformConfigGenerator
     classes, and then calls the methods to generate the Terraform configs.
     It's also responsible for running the Terraform commands to import
     the resources into the Terraform state.
+    The wall time, object counts, subprocess time and peak memory of each stage
+    are written to <target_dir>/run_report.json, also when the run fails.
     """
-    connector = SnowflakeConnector()
-    generator = TerraformConfigGenerator(connector)
-    generator.generate_variables_tf_file()
-    generator.generate_providers_tf_file()
-    generator.add_missing_environment_variables_to_tfvars_file()
-    generator.write_resource_configs_to_tf_files()
-    generator.run_terraform_init()
-    generator.import_resources()
-    generator.update_tf_files_with_optional_properties()
+    args = parse_args(argv)
+    if args.accounts_config:
+        main_accounts(args)
+        return
+    report = RunReport()
+    profiler = ThreadedProfiler() if args.profile else None
+    try:
+        with report.stage("run"):
+            if profiler is not None:
+                profiler.runcall(run, args, report)
+            else:
+                run(args, report)
+    finally:
+        os.makedirs(args.target_dir, exist_ok=True)
+        run_report_file_path = os.path.join(args.target_dir, RUN_REPORT_FILE_NAME)
+        report.write(run_report_file_path)
+        print(f"Run report written to {run_report_file_path}.")
+        if profiler is not None:
+            profile_file_path = os.path.join(args.target_dir, PROFILE_FILE_NAME)
+            profiler.dump_stats(profile_file_path)
+            profiler.stats().sort_stats("cumulative").print_stats(25)
+            print(f"Profile written to {profile_file_path}.")
 
 if __name__ == "__main__":
     main()
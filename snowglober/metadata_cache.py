@@ -0,0 +1,94 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class MetadataCache:
+    """
+    This class is an on-disk cache of SHOW query results, keyed by account, role and query.
+    Each result is a gzip-compressed JSON lines file: a header line with the key, then one line per row.
+    Results older than ttl seconds are treated as missing.
+    """
+
+    def __init__(self, cache_dir='target/.cache', ttl=3600, refresh=False):
+        """
+        This method sets up the cache in cache_dir.
+        With refresh set, cached results are never read, but fresh results are still written.
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.refresh = refresh
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _file_path(self, account, role, query):
+        """
+        This method returns the path of the cache file of a key.
+        """
+        key = json.dumps([account, role, query])
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode()).hexdigest() + '.jsonl.gz')
+
+    def get(self, account, role, query):
+        """
+        This method returns an iterator over the cached rows of a query, or None if they aren't cached or have expired.
+        """
+        if self.refresh:
+            return None
+        file_path = self._file_path(account, role, query)
+        try:
+            age = time.time() - os.path.getmtime(file_path)
+        except OSError:
+            return None
+        if age > self.ttl:
+            return None
+        return self._iter_rows(file_path)
+
+    def _iter_rows(self, file_path):
+        """
+        This method yields the rows of a cache file, skipping its header line.
+        """
+        with gzip.open(file_path, 'rt') as f:
+            next(f)
+            for line in f:
+                yield json.loads(line)
+
+    def write_through(self, account, role, query, rows):
+        """
+        This method yields the rows of a query and caches them as they pass through.
+        The cache file only replaces the previous one once all rows have been read.
+        """
+        file_path = self._file_path(account, role, query)
+        tmp_file_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp_file_path, 'wt') as f:
+                f.write(json.dumps({"account": account, "role": role, "query": query}) + "\n")
+                for row in rows:
+                    f.write(json.dumps(row, default=str) + "\n")
+                    yield row
+            os.replace(tmp_file_path, file_path)
+        finally:
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
+
+    def invalidate(self, account=None, role=None, query=None):
+        """
+        This method removes the cached results matching the given account, role and query.
+        Arguments left as None match anything, so invalidate() clears the whole cache.
+        It returns the number of results removed.
+        """
+        removed = 0
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith('.jsonl.gz'):
+                continue
+            file_path = os.path.join(self.cache_dir, file_name)
+            if account is not None or role is not None or query is not None:
+                with gzip.open(file_path, 'rt') as f:
+                    header = json.loads(next(f))
+                if any(value is not None and header[key] != value for key, value in
+                       (("account", account), ("role", role), ("query", query))):
+                    continue
+            os.remove(file_path)
+            removed += 1
+        return removed
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import re
+from snowglober.snowflake_connector import SnowflakeConnector
+
+
+def fixture_file_path(fixture_dir, query):
+    """
+    This function returns the path of the fixture file holding the result of a query,
+    e.g. fixtures/show_schemas_in_database_ANALYTICS_1a2b3c4d.jsonl.
+    Each file holds one JSON object per row.
+    """
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', query).strip('_')[:80]
+    digest = hashlib.sha1(query.encode()).hexdigest()[:8]
+    return os.path.join(fixture_dir, f"{slug}_{digest}.jsonl")
+
+
+class RecordingConnector(SnowflakeConnector):
+    """
+    This class is a SnowflakeConnector that saves the result of every query it runs to a fixture directory,
+    so that a ReplayConnector can serve them back later without network access.
+    """
+
+    def __init__(self, fixture_dir, **kwargs):
+        """
+        This method connects to Snowflake like SnowflakeConnector and creates the fixture directory.
+        """
+        super().__init__(**kwargs)
+        self.fixture_dir = fixture_dir
+        os.makedirs(self.fixture_dir, exist_ok=True)
+
+    def _iter_query(self, query, batch_size=1000):
+        """
+        This method yields the rows of a query like SnowflakeConnector and writes them to the query's fixture file.
+        The fixture file only appears once all rows have been read.
+        """
+        file_path = fixture_file_path(self.fixture_dir, query)
+        with open(file_path + '.tmp', 'w') as f:
+            for row in super()._iter_query(query, batch_size):
+                f.write(json.dumps(row, default=str) + "\n")
+                yield row
+        os.replace(file_path + '.tmp', file_path)
+
+    def _execute_query(self, query):
+        """
+        This method executes a query like SnowflakeConnector and saves its result to the query's fixture file.
+        """
+        return list(self._iter_query(query))
+
+
+class ReplayConnector(SnowflakeConnector):
+    """
+    This class is a SnowflakeConnector that serves query results from a fixture directory
+    written by RecordingConnector (or by a synthetic account generator) instead of connecting to Snowflake.
+    """
+
+    def __init__(self, fixture_dir, max_connections=4, cache=None):
+        """
+        This method sets up the connector without connecting to Snowflake.
+        """
+        self.fixture_dir = fixture_dir
+        self.max_connections = max_connections
+        self.cache = cache
+        self.account = None
+        self.role = None
+
+    def _iter_query(self, query, batch_size=1000):
+        """
+        This method yields the recorded rows of a query one at a time.
+        It raises FileNotFoundError if the query wasn't recorded.
+        """
+        file_path = fixture_file_path(self.fixture_dir, query)
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"No recorded result for query '{query}' ({file_path})")
+        with open(file_path, 'r') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def _execute_query(self, query):
+        """
+        This method returns the recorded rows of a query.
+        """
+        return list(self._iter_query(query))
+
+    def close(self):
+        """
+        This method does nothing, as a ReplayConnector has no connections.
+        """
+
+
+def write_fixture(fixture_dir, query, rows):
+    """
+    This function writes the rows of a query to its fixture file, e.g. to build a synthetic account.
+    """
+    os.makedirs(fixture_dir, exist_ok=True)
+    with open(fixture_file_path(fixture_dir, query), 'w') as f:
+        for row in rows:
+            f.write(json.dumps(row, default=str) + "\n")
@@ -0,0 +1,98 @@
+import fnmatch
+import re
+from types import MappingProxyType
+
+
+class ResourceSchema:
+    """
+    This class is a compiled, immutable view of the valid_properties of one resource type.
+    It's built once and then shared by every stage of the pipeline.
+    """
+
+    __slots__ = (
+        "resource_type",
+        "required_properties",
+        "optional_properties",
+        "show_columns",
+        "required_columns",
+        "id_columns",
+        "hashed_columns",
+        "names_to_ignore",
+        "ignore_pattern",
+    )
+
+    def __init__(self, resource_type, required_properties, optional_properties, names_to_ignore=(), show_columns=None,
+                 required_columns=None, id_columns=("name",)):
+        """
+        This method compiles the properties of a resource type.
+        required_columns maps required properties to the SHOW column they're read from when the names differ,
+        e.g. 'database' is read from 'database_name'.
+        id_columns are the SHOW columns that make up the import ID of an object, joined with '|'.
+        names_to_ignore can hold exact names (compared case-insensitively), glob patterns such as '*_TEMP'
+        and regular expressions prefixed with 're:', such as 're:^SVC_[0-9]+$'.
+        All patterns are compiled into a single case-insensitive regular expression.
+        """
+        show_columns = dict(show_columns or {})
+        required_columns = {key: (required_columns or {}).get(key, key) for key in required_properties}
+        exact_names = set()
+        patterns = []
+        for name in names_to_ignore:
+            if name.startswith("re:"):
+                patterns.append(f"(?:{name[3:]})")
+            elif any(char in name for char in "*?["):
+                patterns.append(fnmatch.translate(name))
+            else:
+                exact_names.add(name.upper())
+
+        set_attribute = super().__setattr__
+        set_attribute("resource_type", resource_type)
+        set_attribute("required_properties", tuple(dict.fromkeys(required_properties)))  # keeps the order of the generated config
+        set_attribute("optional_properties", frozenset(optional_properties))
+        set_attribute("show_columns", MappingProxyType(show_columns))
+        set_attribute("required_columns", MappingProxyType(required_columns))
+        set_attribute("id_columns", tuple(id_columns))
+        set_attribute("hashed_columns", tuple(sorted(
+            set(required_columns.values()) | set(id_columns) | {column for column, _ in show_columns.values()})))
+        set_attribute("names_to_ignore", frozenset(exact_names))
+        set_attribute("ignore_pattern", re.compile("|".join(patterns), re.IGNORECASE) if patterns else None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.resource_type!r})"
+
+    def import_id(self, resource):
+        """
+        This method returns the import ID of an object from its SHOW row, e.g. 'DB|SCHEMA|STAGE'.
+        """
+        return "|".join(str(resource[column]) for column in self.id_columns)
+
+    def is_ignored(self, name):
+        """
+        This method returns True if no config should be generated for the object with the given name.
+        """
+        if name.upper() in self.names_to_ignore:
+            return True
+        return self.ignore_pattern is not None and self.ignore_pattern.match(name) is not None
+
+
+def compile_resource_schemas(valid_properties):
+    """
+    This function compiles a valid_properties dictionary into a read-only mapping of resource type to ResourceSchema.
+    """
+    return MappingProxyType({
+        resource_type: ResourceSchema(
+            resource_type,
+            properties["required_properties"],
+            properties["optional_properties"],
+            properties.get("names_to_ignore", ()),
+            properties.get("show_columns"),
+            properties.get("required_columns"),
+            properties.get("id_columns", ("name",)),
+        )
+        for resource_type, properties in valid_properties.items()
+    })
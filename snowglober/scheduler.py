@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class ContainerScheduler:
+    """
+    This class runs per-container work, such as a SHOW ... IN DATABASE query per database, concurrently.
+    All work submitted to one scheduler shares a single pool of max_parallelism threads,
+    so the number of concurrent queries stays bounded however many resource types fan out at once.
+    """
+
+    def __init__(self, max_parallelism=8):
+        """
+        This method sets up the scheduler's thread pool.
+        """
+        if max_parallelism < 1:
+            raise ValueError(f"Invalid max_parallelism '{max_parallelism}'. It should be at least 1")
+        self.max_parallelism = max_parallelism
+        self._executor = ThreadPoolExecutor(max_workers=max_parallelism, thread_name_prefix="snowglober-container")
+
+    def map_unordered(self, func, containers):
+        """
+        This method calls func for each container in the scheduler's pool
+        and yields (container, result) tuples in the order they complete.
+        If a call fails, its exception is raised when its result is reached and the remaining calls are cancelled.
+        """
+        futures = {self._executor.submit(func, container): container for container in containers}
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        """
+        This method waits for the running work to finish and shuts the thread pool down.
+        """
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
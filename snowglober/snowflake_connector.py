@@ -1,30 +1,75 @@
 import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from snowflake.connector import connect, DictCursor
 
 
 class SnowflakeConnector:
 
-    def __init__(self):
+    # Entities that can be listed with a SHOW command
+    valid_entities = [
+        'databases',
+        'roles',
+        'users',
+        'warehouses',
+        ]
+
+    # Entities that are listed per container with a SHOW ... IN <container> command, and the kind of their container.
+    # Grants are listed per role with SHOW GRANTS OF ROLE <role>.
+    container_entities = {
+        'schemas': 'database',
+        'stages': 'schema',
+        'file formats': 'schema',
+        'sequences': 'schema',
+        'grants': 'role',
+        }
+
+    # Number of names identifying a container of each kind, e.g. ('DB', 'SCHEMA') for a schema
+    container_name_lengths = {
+        'database': 1,
+        'schema': 2,
+        'role': 1,
+        }
+
+    def __init__(self, max_connections=4, cache=None, credentials=None):
         """
         This method initializes the SnowflakeConnector class and
         loads the environment variables from the .env file.
+        credentials, if given, is a dictionary keyed by environment variable name (e.g. 'SNOWFLAKE_ACCOUNT')
+        that is used instead of the environment variables, so that several accounts can be used at once.
+        max_connections is the maximum number of connections kept in the pool
+        and therefore the maximum number of queries run concurrently.
+        cache is an optional MetadataCache; SHOW results found in it are served without querying Snowflake.
+        Connections are only opened when a query has to run.
         """
-        load_dotenv()
-        self.user = os.getenv('SNOWFLAKE_USERNAME')
-        self.password = os.getenv('SNOWFLAKE_PASSWORD')
-        self.account = os.getenv('SNOWFLAKE_ACCOUNT')
-        self.warehouse = os.getenv('SNOWFLAKE_WAREHOUSE')
-        self.database = os.getenv('SNOWFLAKE_DATABASE')
-        self.schema = os.getenv('SNOWFLAKE_SCHEMA')
-        self.role = os.getenv('SNOWFLAKE_ROLE')
-        self.connection = self._connect()
+        if credentials is None:
+            load_dotenv()
+            credentials = os.environ
+        self.user = credentials.get('SNOWFLAKE_USERNAME')
+        self.password = credentials.get('SNOWFLAKE_PASSWORD')
+        self.account = credentials.get('SNOWFLAKE_ACCOUNT')
+        self.warehouse = credentials.get('SNOWFLAKE_WAREHOUSE')
+        self.database = credentials.get('SNOWFLAKE_DATABASE')
+        self.schema = credentials.get('SNOWFLAKE_SCHEMA')
+        self.role = credentials.get('SNOWFLAKE_ROLE')
+        self.max_connections = max_connections
+        self.cache = cache
+        self.connection = None  # The first connection opened
+
+        # Pool of idle connections, opened on demand up to max_connections
+        self._pool = queue.Queue()
+        self._pool_size = 0
+        self._pool_lock = threading.Lock()
 
     def _connect(self):
         """
         This method establishes a connection to Snowflake using the
         environment variables defined in the .env file.
+        snowflake.connector is only imported here, as it takes a while to import
+        and commands that don't query Snowflake don't need it.
         """
+        from snowflake.connector import connect
         return connect(
             user=self.user,
             password=self.password,
@@ -35,32 +80,170 @@ class SnowflakeConnector:
             role=self.role
         )
 
+    def _acquire_connection(self):
+        """
+        This method takes an idle connection from the pool.
+        If there is none and the pool isn't full yet, it opens a new connection,
+        otherwise it waits for another query to release one.
+        """
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._pool_lock:
+            open_new_connection = self._pool_size < self.max_connections
+            if open_new_connection:
+                self._pool_size += 1
+
+        if open_new_connection:
+            try:
+                connection = self._connect()
+                if self.connection is None:
+                    self.connection = connection
+                return connection
+            except Exception:
+                with self._pool_lock:
+                    self._pool_size -= 1
+                raise
+        return self._pool.get()
+
+    def _release_connection(self, connection):
+        """
+        This method returns a connection to the pool of idle connections.
+        """
+        self._pool.put(connection)
+
+    def close(self):
+        """
+        This method closes all idle connections in the pool.
+        """
+        while True:
+            try:
+                connection = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            connection.close()
+            with self._pool_lock:
+                self._pool_size -= 1
+
+    def _dict_cursor_class(self):
+        """
+        This method returns the cursor class that returns rows as dictionaries.
+        """
+        from snowflake.connector import DictCursor
+        return DictCursor
+
     def _execute_query(self, query):
         """
         This method executes a query against Snowflake and returns
-        the results.
+        the results. It runs the query on a connection from the pool,
+        so it can be called from several threads at once.
         """
-        cur = self.connection.cursor(DictCursor)
+        connection = self._acquire_connection()
         try:
-            cur.execute(query)
-            return cur.fetchall()
+            cur = connection.cursor(self._dict_cursor_class())
+            try:
+                cur.execute(query)
+                return cur.fetchall()
+            finally:
+                cur.close()
         finally:
-            cur.close()
+            self._release_connection(connection)
 
-    def get_all_objects_of_a_resource_type(self, entity):
+    def _iter_query(self, query, batch_size=1000):
         """
-        This method returns a list of all instances of the specified entity in Snowflake.
-        The entity should be one of: databases, roles, users, warehouses.
+        This method executes a query against Snowflake and yields the resulting rows one at a time.
+        Rows are fetched in batches of batch_size, so the whole result is never held in memory.
+        The pooled connection is held until the generator is exhausted or closed.
         """
-        valid_entities = [
-            'databases',
-            'roles',
-            'users',
-            'warehouses',
-            ]
+        connection = self._acquire_connection()
+        try:
+            cur = connection.cursor(self._dict_cursor_class())
+            try:
+                cur.execute(query)
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                cur.close()
+        finally:
+            self._release_connection(connection)
 
-        if entity not in valid_entities:
-            raise ValueError(f"Invalid entity '{entity}'. Choose one of {valid_entities}")
+    def _iter_cached_query(self, query, batch_size=1000):
+        """
+        This method yields the rows of a query from self.cache if they're cached and fresh,
+        and otherwise runs the query and caches its rows as they're fetched.
+        """
+        cached_rows = self.cache.get(self.account, self.role, query)
+        if cached_rows is not None:
+            return cached_rows
+        return self.cache.write_through(self.account, self.role, query, self._iter_query(query, batch_size))
+
+    def _quote_identifier(self, name):
+        """
+        This method quotes an identifier for use in a query, doubling any double quotes inside it.
+        """
+        return '"' + name.replace('"', '""') + '"'
+
+    def _build_show_query(self, entity, container=None):
+        """
+        This method validates the entity and container and returns the SHOW query listing the entity.
+        Entities in self.valid_entities are listed for the whole account and take no container.
+        Entities in self.container_entities need a container: a tuple of names such as ('DB',) for a database
+        or ('DB', 'SCHEMA') for a schema.
+        """
+        if entity in self.valid_entities and container is None:
+            return f"show {entity}"
+
+        if entity not in self.container_entities:
+            raise ValueError(f"Invalid entity '{entity}'. Choose one of {self.valid_entities + list(self.container_entities)}")
+
+        container_kind = self.container_entities[entity]
+        if container is None or len(container) != self.container_name_lengths[container_kind]:
+            raise ValueError(f"Entity '{entity}' needs a {container_kind} container, got {container!r}")
+
+        container_name = ".".join(self._quote_identifier(name) for name in container)
+        if entity == 'grants':
+            return f"show grants of role {container_name}"
+        return f"show {entity} in {container_kind} {container_name}"
 
-        query = f"show {entity}"
+    def get_all_objects_of_a_resource_type(self, entity, container=None):
+        """
+        This method returns a list of all instances of the specified entity in Snowflake.
+        The entity should be one of: databases, roles, users, warehouses,
+        or one of: schemas (in a database container), stages, file formats, sequences (in a schema container),
+        grants (of a role container).
+        """
+        query = self._build_show_query(entity, container)
+        if self.cache is not None:
+            return list(self._iter_cached_query(query))
         return self._execute_query(query)
+
+    def iter_all_objects_of_a_resource_type(self, entity, container=None, batch_size=1000):
+        """
+        This method yields all instances of the specified entity in Snowflake one at a time,
+        fetching them in batches of batch_size.
+        The entity and container are the same as for get_all_objects_of_a_resource_type.
+        """
+        query = self._build_show_query(entity, container)
+        if self.cache is not None:
+            return self._iter_cached_query(query, batch_size)
+        return self._iter_query(query, batch_size)
+
+    def get_all_objects_concurrently(self, entities, max_workers=None):
+        """
+        This method runs the SHOW command of each entity concurrently, each on its own pooled connection.
+        It yields (entity, objects) tuples in the order the queries complete, so the caller can
+        process the results of fast queries while the slow ones are still running.
+        max_workers defaults to self.max_connections.
+        """
+        for entity in entities:
+            self._build_show_query(entity)
+
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_connections) as executor:
+            futures = {executor.submit(self.get_all_objects_of_a_resource_type, entity): entity for entity in entities}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from snowglober import main
+from snowglober.accounts import load_accounts_config, resolve_credentials, run_accounts
+
+class TestAccounts(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = os.path.join(self.tmp_dir.name, 'target')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_config(self, config):
+        file_path = os.path.join(self.tmp_dir.name, 'accounts.json')
+        with open(file_path, 'w') as f:
+            json.dump(config, f)
+        return file_path
+
+    def test_load_accounts_config(self):
+        config = load_accounts_config(self.write_config({"accounts": [{"name": "prod"}, {"name": "dev"}]}))
+        self.assertEqual((config["output_dir"], config["max_workers"]), ("target", 4))
+        self.assertEqual(config["plugin_cache_dir"], os.path.join("target", ".plugin-cache"))
+
+        for accounts in ([], [{"name": "prod"}, {"name": "prod"}], [{"name": "../prod"}], [{}]):
+            with self.assertRaises(ValueError):
+                load_accounts_config(self.write_config({"accounts": accounts}))
+
+    def test_resolve_credentials(self):
+        env_file_path = os.path.join(self.tmp_dir.name, '.env.dev')
+        with open(env_file_path, 'w') as f:
+            f.write('SNOWFLAKE_ACCOUNT="dev_account"\nSNOWFLAKE_ROLE="SYSADMIN"\nSNOWFLAKE_USERNAME="file_user"\n')
+        account = {"name": "dev", "env_file": env_file_path, "env_prefix": "DEV_", "credentials": {"SNOWFLAKE_ROLE": "ACCOUNTADMIN"}}
+
+        with mock.patch.dict(os.environ, {"DEV_SNOWFLAKE_USERNAME": "env_user", "SNOWFLAKE_PASSWORD": "not this one"}):
+            credentials = resolve_credentials(account)
+
+        self.assertEqual(credentials, {"SNOWFLAKE_ACCOUNT": "dev_account", "SNOWFLAKE_USERNAME": "env_user", "SNOWFLAKE_ROLE": "ACCOUNTADMIN"})
+
+    def test_run_accounts_in_a_bounded_pool(self):
+        config = {"output_dir": self.output_dir, "max_workers": 2, "plugin_cache_dir": os.path.join(self.tmp_dir.name, 'plugins'),
+                  "accounts": [{"name": name, "credentials": {"SNOWFLAKE_ACCOUNT": name}} for name in ("a", "b", "c", "d")]}
+        lock = threading.Lock()
+        running = [0, 0]  # running now, most running at once
+
+        def run_account(name, target_dir, credentials, plugin_cache_dir):
+            with lock:
+                running[0] += 1
+                running[1] = max(running[1], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            self.assertEqual(plugin_cache_dir, os.path.abspath(config["plugin_cache_dir"]))
+            self.assertEqual(target_dir, os.path.join(self.output_dir, name))
+            if name == "c":
+                raise RuntimeError("login failed")
+            return {"objects": len(credentials["SNOWFLAKE_ACCOUNT"])}
+
+        with mock.patch.dict(os.environ, {"TF_PLUGIN_CACHE_DIR": "elsewhere"}):
+            summaries = run_accounts(config, run_account)
+            self.assertEqual(os.environ["TF_PLUGIN_CACHE_DIR"], "elsewhere")
+
+        self.assertEqual(running[1], 2)
+        self.assertEqual([summary["account"] for summary in summaries], ["a", "b", "c", "d"])
+        self.assertEqual([summary["status"] for summary in summaries], ["succeeded", "succeeded", "failed", "succeeded"])
+        self.assertEqual(summaries[2]["error"], "RuntimeError: login failed")
+        self.assertEqual(summaries[0]["objects"], 1)
+        with open(os.path.join(self.output_dir, 'accounts_summary.json')) as f:
+            self.assertEqual(json.load(f), summaries)
+
+    def test_run_account_uses_the_shared_plugin_cache(self):
+        generator = mock.Mock(snapshot={"snowflake_user.AMIR": {}}, resource_mapping={"snowflake_user.AMIR": "AMIR"}, import_failures=[])
+        target_dir = os.path.join(self.output_dir, 'prod')
+        for direct_render, imported in ((False, 1), (True, 0)):
+            args = main.parse_args(['--plugin-cache-dir', 'ignored'] + (['--direct-render'] if direct_render else []))
+            with mock.patch.object(main, 'run', return_value=generator) as run:
+                summary = main.run_account(args, 'prod', target_dir, {}, '/shared/plugins')
+
+            self.assertEqual(run.call_args.args[2:], (target_dir, {}, '/shared/plugins'))
+            self.assertEqual(summary, {"objects": 1, "imported": imported, "import_failures": 0})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from snowglober import cli
+from snowglober.replay import ReplayConnector, write_fixture
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks')
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from synthetic_account import write_synthetic_account
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self.original_cwd = os.getcwd()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp_dir.name)
+
+    def tearDown(self):
+        os.chdir(self.original_cwd)
+        self.tmp_dir.cleanup()
+
+    def test_vars_does_not_import_the_snowflake_connector(self):
+        code = ("import sys; from snowglober.cli import main; main(['vars', '--target-dir', 'out']); "
+                "print('snowflake.connector' in sys.modules)")
+        env = {**os.environ, 'PYTHONPATH': os.path.join(BENCHMARKS_DIR, '..'), 'SNOWFLAKE_ACCOUNT': 'my_account'}
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, check=True)
+
+        self.assertEqual(result.stdout.splitlines()[-1], "False")
+        self.assertEqual(sorted(os.listdir('out')), ['providers.tf', 'terraform.tfvars', 'variables.tf'])
+        with open('out/terraform.tfvars') as f:
+            self.assertIn('snowflake_account = "my_account"', f.read())
+
+    def test_extract_import_and_patch_run_as_separate_commands(self):
+        counts = write_synthetic_account('fixtures', 20)
+        bin_dir = os.path.join(self.tmp_dir.name, 'bin')
+        os.makedirs(bin_dir)
+        os.symlink(os.path.join(BENCHMARKS_DIR, 'fake_terraform.py'), os.path.join(bin_dir, 'terraform'))
+
+        with mock.patch.dict(os.environ, {'PATH': bin_dir + os.pathsep + os.environ['PATH']}), \
+                mock.patch.object(cli, 'make_connector', return_value=ReplayConnector('fixtures')), \
+                contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                cli.main(['import'])
+            cli.main(['vars', '--plugin-cache-dir', 'plugins'])
+            cli.main(['extract', '--cache-ttl', '0'])
+            cli.main(['import', '--import-mode', 'batch', '--plugin-cache-dir', 'plugins'])
+            cli.main(['patch'])
+
+        with open('target/terraform.tfstate') as f:
+            self.assertEqual(len(json.load(f)["resources"]), sum(counts.values()))
+        with open('target/snowflake_user.tf') as f:
+            self.assertIn('    comment = "Imported by fake terraform"\n}', f.read())
+
+    def run_with_fake_terraform(self, *commands):
+        bin_dir = os.path.join(self.tmp_dir.name, 'bin')
+        if not os.path.exists(bin_dir):
+            os.makedirs(bin_dir)
+            os.symlink(os.path.join(BENCHMARKS_DIR, 'fake_terraform.py'), os.path.join(bin_dir, 'terraform'))
+        with mock.patch.dict(os.environ, {'PATH': bin_dir + os.pathsep + os.environ['PATH']}), \
+                mock.patch.object(cli, 'make_connector', side_effect=lambda *args: ReplayConnector('fixtures')), \
+                contextlib.redirect_stdout(io.StringIO()):
+            for command in commands:
+                cli.main(command + ['--plugin-cache-dir', 'plugins'])
+
+    def test_import_and_patch_use_the_options_of_the_extraction(self):
+        counts = write_synthetic_account('fixtures', 20)
+        self.run_with_fake_terraform(['vars'], ['extract', '--cache-ttl', '0'], ['import'])
+
+        # An incremental extraction imported without --incremental keeps the state
+        warehouses_query = ReplayConnector('fixtures')._build_show_query('warehouses')
+        write_fixture('fixtures', warehouses_query, [{"name": "WAREHOUSE_0", "size": "Large"}])
+        self.run_with_fake_terraform(['extract', '--cache-ttl', '0', '--incremental'], ['import'])
+        with open('target/terraform.tfstate') as f:
+            self.assertEqual(len(json.load(f)["resources"]), sum(counts.values()))
+
+        # A JSON extraction is imported in shards and patched without --output-format
+        self.run_with_fake_terraform(['extract', '--cache-ttl', '0', '--output-format', 'json'], ['import', '--shards', '2'], ['patch'])
+        with open('target/snowflake_user.tf.json') as f:
+            users = json.load(f)["resource"]["snowflake_user"]
+        self.assertTrue(all(user["comment"] == "Imported by fake terraform" for user in users.values()))
+
+    def test_diff_reports_drift_without_changing_files(self):
+        write_synthetic_account('fixtures', 20)
+        with mock.patch.object(cli, 'make_connector', side_effect=lambda *args: ReplayConnector('fixtures')), \
+                contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                cli.main(['diff'])
+            cli.main(['render', '--cache-ttl', '0'])
+            cli.main(['diff', '--detailed-exitcode'])
+            with open('target/drift_report.json') as f:
+                self.assertEqual(json.load(f)["summary"]["changed"], 0)
+
+            warehouses_query = ReplayConnector('fixtures')._build_show_query('warehouses')
+            write_fixture('fixtures', warehouses_query, [
+                {"name": "WAREHOUSE_0", "size": "Large", "auto_suspend": 60, "auto_resume": "true", "type": "STANDARD"},
+                {"name": "ADHOC", "size": "X-Small"},
+            ])
+            with open('target/snowflake_warehouse.tf') as f:
+                tf_file_content = f.read()
+            with self.assertRaises(SystemExit) as context:
+                cli.main(['diff', '--detailed-exitcode'])
+            self.assertEqual(context.exception.code, 2)
+
+        with open('target/drift_report.json') as f:
+            report = json.load(f)
+        self.assertEqual(report["summary"], {"added": 1, "removed": 0, "changed": 1, "unchanged": 19})
+        self.assertEqual(report["added"][0]["id"], "ADHOC")
+        self.assertEqual(report["changed"][0]["changes"], {"warehouse_size": {"tf": "X-SMALL", "snowflake": "LARGE"}})
+        with open('target/snowflake_warehouse.tf') as f:
+            self.assertEqual(f.read(), tf_file_content)
+        self.assertFalse(os.path.exists('target/terraform.tfstate'))
+
+if __name__ == "__main__":
+    unittest.main()
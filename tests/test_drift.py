@@ -0,0 +1,61 @@
+import unittest
+from snowglober.drift import diff_resource_configs, has_drift
+from snowglober.resource_schema import compile_resource_schemas
+
+class TestDrift(unittest.TestCase):
+
+    def setUp(self):
+        self.resource_schemas = compile_resource_schemas({
+            "snowflake_warehouse": {
+                "required_properties": ["name"],
+                "optional_properties": ["comment", "warehouse_size", "auto_suspend", "statement_timeout_in_seconds"],
+                "show_columns": {"comment": ("comment", str), "warehouse_size": ("size", str), "auto_suspend": ("auto_suspend", int)},
+            },
+            "snowflake_role_grants": {
+                "required_properties": ["role_name"],
+                "optional_properties": ["roles", "users"],
+                "show_columns": {"roles": ("roles", list), "users": ("users", list)},
+            },
+        })
+
+    def test_added_removed_and_changed_resources(self):
+        tf_configs = {
+            "snowflake_warehouse.LOADING": {"name": "LOADING", "warehouse_size": "XSMALL", "auto_suspend": 60,
+                                            "statement_timeout_in_seconds": 172800},
+            "snowflake_warehouse.REPORTING": {"name": "REPORTING", "warehouse_size": "SMALL", "comment": ""},
+            "snowflake_warehouse.OLD": {"name": "OLD"},
+            "snowflake_role_grants.ANALYST": {"role_name": "ANALYST", "users": ["AMIR", "BOB"], "roles": []},
+        }
+        snowflake_configs = {
+            "snowflake_warehouse.LOADING": {"name": "LOADING", "warehouse_size": "LARGE", "auto_suspend": 60, "comment": "Resized"},
+            "snowflake_warehouse.REPORTING": {"name": "REPORTING", "warehouse_size": "SMALL"},
+            "snowflake_warehouse.NEW": {"name": "NEW", "warehouse_size": "XSMALL"},
+            "snowflake_role_grants.ANALYST": {"role_name": "ANALYST", "users": ["BOB", "AMIR"]},
+        }
+        snapshot = {"snowflake_warehouse.NEW": {"id": "NEW", "hash": "abc"}}
+
+        report = diff_resource_configs(self.resource_schemas, tf_configs, snowflake_configs, snapshot)
+
+        self.assertEqual(report["summary"], {"added": 1, "removed": 1, "changed": 1, "unchanged": 2})
+        self.assertEqual(report["added"], [{"address": "snowflake_warehouse.NEW", "type": "snowflake_warehouse", "name": "NEW",
+                                            "id": "NEW", "properties": {"name": "NEW", "warehouse_size": "XSMALL"}}])
+        self.assertEqual([resource["address"] for resource in report["removed"]], ["snowflake_warehouse.OLD"])
+        # statement_timeout_in_seconds isn't in the SHOW output, so it's not compared
+        self.assertEqual(report["changed"][0]["changes"], {
+            "warehouse_size": {"tf": "XSMALL", "snowflake": "LARGE"},
+            "comment": {"tf": None, "snowflake": "Resized"},
+        })
+        self.assertTrue(has_drift(report))
+
+    def test_only_required_properties_are_compared_for_extracted_resources(self):
+        # An extracted resource only sets its required properties, so the others are unknown rather than missing
+        tf_configs = {"snowflake_warehouse.LOADING": {"name": "LOADING"}}
+        snowflake_configs = {"snowflake_warehouse.LOADING": {"name": "LOADING", "warehouse_size": "LARGE", "comment": "Loading"}}
+
+        report = diff_resource_configs(self.resource_schemas, tf_configs, snowflake_configs)
+
+        self.assertEqual(report["summary"], {"added": 0, "removed": 0, "changed": 0, "unchanged": 1})
+        self.assertFalse(has_drift(report))
+
+if __name__ == "__main__":
+    unittest.main()
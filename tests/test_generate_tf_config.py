@@ -0,0 +1,584 @@
+import json
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+from snowglober.generate_tf_config import TerraformConfigGenerator
+from snowglober.hcl import sanitize_identifier
+from snowglober.instrumentation import ThreadedProfiler
+
+class FakeConnector:
+    """A SnowflakeConnector stand-in that serves SHOW results from memory."""
+
+    def __init__(self, objects=None):
+        self.objects = objects or {}
+
+    def get_all_objects_of_a_resource_type(self, entity, container=None):
+        return list(self.objects.get(entity if container is None else (entity, container), []))
+
+    def iter_all_objects_of_a_resource_type(self, entity, container=None):
+        yield from self.objects.get(entity if container is None else (entity, container), [])
+
+class TestTerraformConfigGenerator(unittest.TestCase):
+
+    def setUp(self):
+        """Run each test in its own empty working directory."""
+        self.original_cwd = os.getcwd()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp_dir.name)
+        self.connector = FakeConnector({
+            'databases': [{'name': 'ANALYTICS'}],
+            'roles': [{'name': 'ANALYST'}],
+            'users': [{'name': 'AMIR', 'login_name': 'AMIR'}, {'name': 'SNOWFLAKE', 'login_name': 'SNOWFLAKE'}],
+            'warehouses': [{'name': 'COMPUTE_WH'}],
+        })
+
+    def tearDown(self):
+        os.chdir(self.original_cwd)
+        self.tmp_dir.cleanup()
+
+    def test_invalid_import_mode(self):
+        with self.assertRaises(ValueError):
+            TerraformConfigGenerator(self.connector, import_mode="parallel")
+
+    def test_batch_import_runs_terraform_once(self):
+        generator = TerraformConfigGenerator(self.connector, import_mode="batch")
+        generator.write_resource_configs_to_tf_files()
+
+        imports_file_path = os.path.join('target', generator.tf_imports_file_name)
+        override_file_path = os.path.join('target', generator.tf_imports_override_file_name)
+        written_files = {}
+
+        def fake_run(args, **kwargs):
+            # Capture the import files as they exist while terraform runs
+            for file_path in (imports_file_path, override_file_path):
+                with open(file_path) as f:
+                    written_files[file_path] = f.read()
+
+        with mock.patch("snowglober.generate_tf_config.subprocess.run", side_effect=fake_run) as run:
+            generator.import_resources()
+
+        run.assert_called_once()
+        self.assertIn("apply", run.call_args.args[0])
+        imports = written_files[imports_file_path]
+        self.assertEqual(imports.count("import {"), 4)
+        self.assertIn('to = snowflake_user.AMIR', imports)
+        self.assertNotIn('snowflake_user.SNOWFLAKE', imports)
+        self.assertIn('ignore_changes = all', written_files[override_file_path])
+        # The import files are only needed while terraform runs
+        self.assertFalse(os.path.exists(imports_file_path))
+        self.assertFalse(os.path.exists(override_file_path))
+
+    def test_single_import_runs_terraform_per_resource(self):
+        generator = TerraformConfigGenerator(self.connector, import_mode="single")
+        generator.write_resource_configs_to_tf_files()
+
+        with mock.patch("snowglober.generate_tf_config.subprocess.run") as run:
+            generator.import_resources()
+
+        self.assertEqual(run.call_count, 4)
+        import_stage = next(record for record in generator.report.stages if record["stage"] == "import")
+        self.assertEqual((import_stage["objects"], import_stage["subprocesses"]), (4, 4))
+        self.assertEqual(len(import_stage["slowest"]), 4)
+        extract_stages = {record["resource_type"]: record for record in generator.report.stages if record["stage"] == "extract_and_render"}
+        self.assertEqual(extract_stages["snowflake_user"]["objects"], 1)
+        self.assertIn("extract_time", extract_stages["snowflake_user"])
+        self.assertIn(["import", "snowflake_database.ANALYTICS", "ANALYTICS"], [call.args[0][2:] for call in run.call_args_list])
+
+    def test_target_dir(self):
+        generator = TerraformConfigGenerator(self.connector, import_mode="single", target_dir=os.path.join('out', 'prod'))
+        generator.generate_variables_tf_file()
+        generator.add_missing_environment_variables_to_tfvars_file({"SNOWFLAKE_ACCOUNT": "prod_account"})
+        generator.write_resource_configs_to_tf_files()
+        with mock.patch("snowglober.generate_tf_config.subprocess.run") as run:
+            generator.import_resources()
+
+        self.assertFalse(os.path.exists('target'))
+        self.assertTrue(os.path.exists('out/prod/snowflake_user.tf'))
+        self.assertTrue(os.path.exists('out/prod/variables.tf'))
+        with open('out/prod/terraform.tfvars') as f:
+            self.assertIn('snowflake_account = "prod_account"', f.read())
+        self.assertEqual({call.args[0][1] for call in run.call_args_list}, {"-chdir=out/prod"})
+
+    def test_terraform_init_is_skipped_when_already_initialized(self):
+        generator = TerraformConfigGenerator(self.connector, plugin_cache_dir='plugins', plugin_dir='mirror')
+        generator.generate_providers_tf_file()
+        with open(generator.tf_providers_file_path) as f:
+            self.assertIn('version = "0.87.0"', f.read())
+
+        def fake_init(args, **kwargs):
+            os.makedirs('target/.terraform', exist_ok=True)
+            with open(generator.tf_lock_file_path, 'w') as f:
+                f.write('# lock file\n')
+
+        with mock.patch("snowglober.generate_tf_config.subprocess.run", side_effect=fake_init) as run:
+            generator.run_terraform_init()
+            generator.run_terraform_init()
+        run.assert_called_once()
+        self.assertEqual(run.call_args.args[0][:4], ["terraform", "-chdir=target", "init", "-input=false"])
+        self.assertNotIn("-upgrade", run.call_args.args[0])
+        self.assertIn(f"-plugin-dir={os.path.abspath('mirror')}", run.call_args.args[0])
+        self.assertEqual(run.call_args.kwargs["env"]["TF_PLUGIN_CACHE_DIR"], os.path.abspath('plugins'))
+        self.assertTrue(os.path.isdir('plugins'))
+
+        # A different provider version needs a new init, which may upgrade the provider in the lock file
+        generator = TerraformConfigGenerator(self.connector, provider_version="0.88.0")
+        generator.generate_providers_tf_file()
+        with mock.patch("snowglober.generate_tf_config.subprocess.run", side_effect=fake_init) as run:
+            generator.run_terraform_init()
+        run.assert_called_once()
+        self.assertEqual(run.call_args.args[0], ["terraform", "-chdir=target", "init", "-input=false", "-upgrade"])
+        self.assertEqual([record.get("skipped", False) for record in generator.report.stages if record["stage"] == "terraform_init"], [False])
+
+    def test_auto_import_mode_follows_terraform_version(self):
+        generator = TerraformConfigGenerator(self.connector)
+        with mock.patch.object(generator, "_get_terraform_version", return_value=(1, 5, 7)):
+            self.assertEqual(generator._resolve_import_mode(), "batch")
+        with mock.patch.object(generator, "_get_terraform_version", return_value=(1, 4, 6)):
+            self.assertEqual(generator._resolve_import_mode(), "single")
+        with mock.patch.object(generator, "_get_terraform_version", return_value=None):
+            self.assertEqual(generator._resolve_import_mode(), "single")
+
+    def test_sharded_import_merges_shard_states(self):
+        generator = TerraformConfigGenerator(self.connector, import_mode="single", shards=3)
+        generator.write_resource_configs_to_tf_files()
+        os.makedirs('target/.terraform')  # as left behind by 'terraform init'
+
+        def fake_run(args, **kwargs):
+            # Simulate 'terraform import' appending the resource to the shard's state
+            working_dir = args[1].split("=", 1)[1]
+            with open(os.path.join(working_dir, generator.tf_shard_resources_file_name)) as f:
+                self.assertIn('resource "{}" "{}" {{'.format(*args[3].split(".")), f.read())
+            state_path = os.path.join(working_dir, 'terraform.tfstate')
+            state = {"version": 4, "serial": 1, "lineage": "x", "resources": []}
+            if os.path.exists(state_path):
+                with open(state_path) as f:
+                    state = json.load(f)
+            resource_type, name = args[3].split(".")
+            state["resources"].append({"type": resource_type, "name": name, "instances": [{"attributes": {"name": args[4]}}]})
+            with open(state_path, 'w') as f:
+                json.dump(state, f)
+
+        with mock.patch("snowglober.generate_tf_config.subprocess.run", side_effect=fake_run):
+            generator.import_resources()
+
+        with open(generator.tfstate_file_path) as f:
+            state = json.load(f)
+        imported = sorted(f"{resource['type']}.{resource['name']}" for resource in state["resources"])
+        self.assertEqual(imported, sorted(generator.resource_mapping))
+        self.assertFalse(any(name.startswith("shard_") for name in os.listdir('target')))
+
+    def fake_single_imports(self, generator, attempts, failures=()):
+        """
+        Return a stand-in for subprocess.run that runs 'terraform import' and 'terraform state rm' on the state file.
+        The attempts of each import are counted, and the resources in failures fail with a permanent error.
+        """
+        def fake_run(args, **kwargs):
+            state = {"version": 4, "serial": 1, "lineage": "x", "resources": []}
+            if os.path.exists(generator.tfstate_file_path):
+                with open(generator.tfstate_file_path) as f:
+                    state = json.load(f)
+            if args[2:4] == ["state", "rm"]:
+                state["resources"] = [resource for resource in state["resources"]
+                                      if f"{resource['type']}.{resource['name']}" not in args[4:]]
+            else:
+                resource_name = args[3]
+                attempts[resource_name] = attempts.get(resource_name, 0) + 1
+                if resource_name in failures:
+                    raise subprocess.CalledProcessError(1, args, stderr="Error: object does not exist")
+                resource_type, name = resource_name.split(".")
+                state["resources"].append({"type": resource_type, "name": name, "instances": [{"attributes": {}}]})
+            with open(generator.tfstate_file_path, 'w') as f:
+                json.dump(state, f)
+        return fake_run
+
+    def test_failed_imports_are_retried_and_reported(self):
+        generator = TerraformConfigGenerator(self.connector, import_mode="single", retry_backoff=0)
+        generator.write_resource_configs_to_tf_files()
+        attempts = {}
+        fake_import = self.fake_single_imports(generator, attempts, failures=["snowflake_role.ANALYST"])
+
+        def fake_run(args, **kwargs):
+            # The warehouse fails once with a transient error, the role always fails
+            if args[3] == "snowflake_warehouse.COMPUTE_WH" and "snowflake_warehouse.COMPUTE_WH" not in attempts:
+                attempts["snowflake_warehouse.COMPUTE_WH"] = 1
+                raise subprocess.CalledProcessError(1, args, stderr="Error: dial tcp: i/o timeout")
+            fake_import(args, **kwargs)
+
+        with mock.patch("snowglober.generate_tf_config.subprocess.run", side_effect=fake_run):
+            generator.import_resources()
+
+        self.assertEqual(attempts["snowflake_warehouse.COMPUTE_WH"], 2)
+        self.assertEqual(attempts["snowflake_role.ANALYST"], 1)
+        with open(generator.import_failures_file_path) as f:
+            self.assertEqual([failure["resource_name"] for failure in json.load(f)], ["snowflake_role.ANALYST"])
+        # The import finished, so the next run doesn't resume it
+        self.assertFalse(os.path.exists(generator.import_checkpoint_file_path))
+
+        # A full run imports everything again, including the objects that changed since
+        self.connector.objects['users'] = [{'name': 'AMIR', 'login_name': 'AMIR_NEW'}]
+        attempts.clear()
+        generator = TerraformConfigGenerator(self.connector, import_mode="single")
+        generator.write_resource_configs_to_tf_files()
+        with mock.patch("snowglober.generate_tf_config.subprocess.run",
+                        side_effect=self.fake_single_imports(generator, attempts, failures=["snowflake_role.ANALYST"])):
+            generator.import_resources()
+        self.assertEqual(sorted(attempts), ["snowflake_database.ANALYTICS", "snowflake_role.ANALYST",
+                                            "snowflake_user.AMIR", "snowflake_warehouse.COMPUTE_WH"])
+
+    def test_incremental_run_after_failures_imports_failed_and_changed_resources(self):
+        generator = TerraformConfigGenerator(self.connector, import_mode="single", incremental=True)
+        generator.write_resource_configs_to_tf_files()
+        attempts = {}
+        with mock.patch("snowglober.generate_tf_config.subprocess.run",
+                        side_effect=self.fake_single_imports(generator, attempts, failures=["snowflake_role.ANALYST"])):
+            generator.import_resources()
+
+        self.connector.objects['users'] = [{'name': 'AMIR', 'login_name': 'AMIR_NEW'}]
+        attempts.clear()
+        generator = TerraformConfigGenerator(self.connector, import_mode="single", incremental=True)
+        generator.write_resource_configs_to_tf_files()
+        with mock.patch("snowglober.generate_tf_config.subprocess.run",
+                        side_effect=self.fake_single_imports(generator, attempts)):
+            generator.import_resources()
+
+        self.assertEqual(attempts, {"snowflake_role.ANALYST": 1, "snowflake_user.AMIR": 1})
+        self.assertEqual(len(generator._get_resource_names_in_state('target')), 4)
+
+    def test_interrupted_import_is_resumed(self):
+        generator = TerraformConfigGenerator(self.connector, import_mode="single")
+        generator.write_resource_configs_to_tf_files()
+        # AMIR is imported before the run is interrupted
+        generator.resource_mapping = dict(sorted(generator.resource_mapping.items(), key=lambda item: item[0] != "snowflake_user.AMIR"))
+        attempts = {}
+        fake_import = self.fake_single_imports(generator, attempts)
+
+        def interrupted_run(args, **kwargs):
+            if len(attempts) == 2:
+                raise KeyboardInterrupt
+            fake_import(args, **kwargs)
+
+        with mock.patch("snowglober.generate_tf_config.subprocess.run", side_effect=interrupted_run), \
+                self.assertRaises(KeyboardInterrupt):
+            generator.import_resources()
+        self.assertTrue(os.path.exists(generator.import_checkpoint_file_path))
+        imported = sorted(attempts)
+        self.assertIn("snowflake_user.AMIR", imported)
+
+        # The next run keeps the resources already imported, except the one that changed in the meantime
+        self.connector.objects['users'] = [{'name': 'AMIR', 'login_name': 'AMIR_NEW'}]
+        attempts.clear()
+        generator = TerraformConfigGenerator(self.connector, import_mode="single")
+        generator.write_resource_configs_to_tf_files()
+        with mock.patch("snowglober.generate_tf_config.subprocess.run", side_effect=self.fake_single_imports(generator, attempts)):
+            generator.import_resources()
+
+        expected = sorted(set(generator.resource_mapping) - set(imported) | {"snowflake_user.AMIR"})
+        self.assertEqual(sorted(attempts), expected)
+        self.assertEqual(len(generator._get_resource_names_in_state('target')), 4)
+        self.assertFalse(os.path.exists(generator.import_checkpoint_file_path))
+
+    def test_failed_batch_import_falls_back_to_single_imports(self):
+        generator = TerraformConfigGenerator(self.connector, import_mode="batch")
+        generator.write_resource_configs_to_tf_files()
+
+        def fake_run(args, **kwargs):
+            if "apply" in args:
+                raise subprocess.CalledProcessError(1, args)
+
+        with mock.patch("snowglober.generate_tf_config.subprocess.run", side_effect=fake_run) as run:
+            generator.import_resources()
+
+        self.assertEqual([call.args[0][2] for call in run.call_args_list], ["apply"] + ["import"] * 4)
+        self.assertEqual(generator.import_failures, [])
+        self.assertFalse(os.path.exists(generator.import_checkpoint_file_path))
+
+    def test_batch_import_is_retried_after_a_transient_error(self):
+        generator = TerraformConfigGenerator(self.connector, import_mode="batch", retry_backoff=0)
+        generator.write_resource_configs_to_tf_files()
+        import_blocks = []
+
+        def fake_run(args, **kwargs):
+            with open(os.path.join('target', generator.tf_imports_file_name)) as f:
+                import_blocks.append(f.read().count("import {"))
+            if len(import_blocks) == 1:
+                # The first apply imports one resource before it times out
+                with open(generator.tfstate_file_path, 'w') as f:
+                    json.dump({"version": 4, "resources": [{"type": "snowflake_user", "name": "AMIR", "instances": []}]}, f)
+                raise subprocess.CalledProcessError(1, args, stderr="Error: dial tcp: i/o timeout")
+
+        with mock.patch("snowglober.generate_tf_config.subprocess.run", side_effect=fake_run) as run, \
+                mock.patch("snowglober.generate_tf_config.time.sleep") as sleep:
+            generator.import_resources()
+
+        self.assertEqual([call.args[0][2] for call in run.call_args_list], ["apply", "apply"])
+        self.assertEqual(import_blocks, [4, 3])
+        sleep.assert_called_once()
+        self.assertEqual(generator.import_failures, [])
+
+    def test_split_resource_mapping_by_type(self):
+        generator = TerraformConfigGenerator(self.connector, shards=8, shard_by="type")
+        generator.write_resource_configs_to_tf_files()
+
+        for shard in generator._split_resource_mapping_into_shards(generator.resource_mapping):
+            self.assertEqual(len({resource_name.split(".")[0] for resource_name in shard}), 1)
+
+    def test_update_tf_files_with_optional_properties(self):
+        generator = TerraformConfigGenerator(self.connector)
+        generator.write_resource_configs_to_tf_files()
+        state = {"version": 4, "resources": [
+            {"type": "snowflake_user", "name": "AMIR", "instances": [{"attributes": {
+                "name": "AMIR", "login_name": "AMIR", "comment": "Hello", "disabled": False,
+                "default_secondary_roles": [], "rsa_public_key_2": None, "password": None, "created_on": "yesterday"}}]},
+            {"type": "snowflake_warehouse", "name": "COMPUTE_WH", "instances": [{"attributes": {
+                "name": "COMPUTE_WH", "auto_suspend": 60}}]},
+        ]}
+        with open(generator.tfstate_file_path, 'w') as f:
+            json.dump(state, f)
+
+        generator.update_tf_files_with_optional_properties()
+
+        with open('target/snowflake_user.tf') as f:
+            self.assertEqual(f.read(), (
+                'resource "snowflake_user" "AMIR" {\n'
+                '    name = "AMIR"\n'
+                '    login_name = "AMIR"\n'
+                '    comment = "Hello"\n'
+                '    disabled = false\n'
+                '    rsa_public_key_2 = null\n'
+                '    password = null\n'
+                '}\n\n'))
+        with open('target/snowflake_warehouse.tf') as f:
+            self.assertIn('    auto_suspend = 60\n}', f.read())
+
+    def test_names_and_values_with_special_characters_are_escaped(self):
+        self.connector.objects['users'] = [{'name': 'first.last@example.com', 'login_name': 'first "quoted" last'}]
+        generator = TerraformConfigGenerator(self.connector, import_mode="batch")
+        generator.write_resource_configs_to_tf_files()
+
+        resource_name = next(name for name in generator.resource_mapping if name.startswith("snowflake_user."))
+        identifier = resource_name.split(".", 1)[1]
+        self.assertRegex(identifier, r"^first_last_example_com_[0-9a-f]{8}$")
+        self.assertEqual(generator.snapshot[resource_name]["id"], 'first.last@example.com')
+        self.assertEqual(generator.resource_mapping[resource_name], 'first.last@example.com')
+
+        state = {"version": 4, "resources": [{"type": "snowflake_user", "name": identifier, "instances": [{"attributes": {
+            "comment": 'Costs ${var.x}\nper "month"', "default_namespace": "C:\\temp"}}]}]}
+        with open(generator.tfstate_file_path, 'w') as f:
+            json.dump(state, f)
+        generator.update_tf_files_with_optional_properties()
+
+        with open('target/snowflake_user.tf') as f:
+            self.assertEqual(f.read(), (
+                f'resource "snowflake_user" "{identifier}" {{\n'
+                '    name = "first.last@example.com"\n'
+                '    login_name = "first \\"quoted\\" last"\n'
+                '    comment = "Costs $${var.x}\\nper \\"month\\""\n'
+                '    default_namespace = "C:\\\\temp"\n'
+                '}\n\n'))
+
+    def test_json_output_format(self):
+        self.connector.objects['users'] = [{'name': 'AMIR', 'login_name': 'AMIR'}, {'name': 'first.last', 'login_name': 'FIRST'}]
+        TerraformConfigGenerator(self.connector).write_resource_configs_to_tf_files()
+        generator = TerraformConfigGenerator(self.connector, output_format="json")
+        generator.write_resource_configs_to_tf_files()
+
+        # The .tf files of the HCL output format are replaced by the .tf.json files
+        self.assertFalse(os.path.exists('target/snowflake_user.tf'))
+        with open('target/snowflake_user.tf.json') as f:
+            users = json.load(f)["resource"]["snowflake_user"]
+        identifier = sanitize_identifier('first.last')
+        self.assertEqual(users, {"AMIR": {"name": "AMIR", "login_name": "AMIR"},
+                                 identifier: {"name": "first.last", "login_name": "FIRST"}})
+
+        state = {"version": 4, "resources": [{"type": "snowflake_user", "name": "AMIR", "instances": [{"attributes": {
+            "comment": "Costs ${var.x}", "disabled": False, "default_secondary_roles": [], "created_on": "yesterday"}}]}]}
+        with open(generator.tfstate_file_path, 'w') as f:
+            json.dump(state, f)
+        generator.update_tf_files_with_optional_properties()
+
+        with open('target/snowflake_user.tf.json') as f:
+            users = json.load(f)["resource"]["snowflake_user"]
+        self.assertEqual(users["AMIR"], {"name": "AMIR", "login_name": "AMIR", "comment": "Costs $${var.x}", "disabled": False})
+        with open('target/snowflake_warehouse.tf.json') as f:
+            self.assertEqual(json.load(f), {"resource": {"snowflake_warehouse": {"COMPUTE_WH": {"name": "COMPUTE_WH"}}}})
+
+    def test_direct_render_writes_complete_resources_and_state(self):
+        self.connector.objects['users'] = [{
+            'name': 'AMIR', 'login_name': 'AMIR', 'comment': '', 'disabled': 'false', 'default_role': 'ANALYST',
+            'default_secondary_roles': '["ALL"]', 'email': None, 'created_on': 'yesterday'}]
+        self.connector.objects['warehouses'] = [{
+            'name': 'COMPUTE_WH', 'size': 'X-Small', 'auto_suspend': 600, 'auto_resume': 'true',
+            'resource_monitor': 'null', 'type': 'STANDARD'}]
+        generator = TerraformConfigGenerator(self.connector)
+
+        with mock.patch.object(generator, "_get_terraform_version", return_value=(1, 6, 0)):
+            generator.write_complete_resource_configs_to_tf_files(write_state=True)
+
+        with open('target/snowflake_user.tf') as f:
+            self.assertEqual(f.read(), (
+                'resource "snowflake_user" "AMIR" {\n'
+                '    name = "AMIR"\n'
+                '    login_name = "AMIR"\n'
+                '    default_role = "ANALYST"\n'
+                '    default_secondary_roles = ["ALL"]\n'
+                '    disabled = false\n'
+                '}\n\n'))
+        with open('target/snowflake_warehouse.tf') as f:
+            warehouse_config = f.read()
+        self.assertIn('    warehouse_size = "X-SMALL"\n', warehouse_config)
+        self.assertIn('    auto_suspend = 600\n', warehouse_config)
+        self.assertIn('    auto_resume = true\n', warehouse_config)
+        self.assertNotIn('resource_monitor', warehouse_config)
+
+        with open(generator.tfstate_file_path) as f:
+            state = json.load(f)
+        self.assertEqual(state["terraform_version"], "1.6.0")
+        resources = {f"{resource['type']}.{resource['name']}": resource for resource in state["resources"]}
+        self.assertEqual(sorted(resources), sorted(generator.resource_mapping))
+        user_attributes = resources["snowflake_user.AMIR"]["instances"][0]["attributes"]
+        self.assertEqual(user_attributes["id"], "AMIR")
+        self.assertEqual(user_attributes["default_secondary_roles"], ["ALL"])
+
+    def test_incremental_run_only_imports_changes(self):
+        self.connector.objects['users'] = [
+            {'name': 'AMIR', 'login_name': 'AMIR', 'comment': 'Hello', 'last_success_login': 'yesterday'},
+            {'name': 'OLD', 'login_name': 'OLD'},
+            {'name': 'CHANGED', 'login_name': 'CHANGED', 'comment': 'Before'},
+        ]
+        generator = TerraformConfigGenerator(self.connector, import_mode="single", incremental=True)
+        generator.write_resource_configs_to_tf_files()
+        with mock.patch("snowglober.generate_tf_config.subprocess.run"):
+            generator.import_resources()
+        self.assertEqual(len(generator.resource_mapping), 6)
+
+        # Pretend the first run imported and patched everything
+        state = {"version": 4, "resources": [
+            {"type": resource_name.split(".")[0], "name": resource_name.split(".")[1], "instances": [{"attributes": {}}]}
+            for resource_name in generator.resource_mapping]}
+        with open(generator.tfstate_file_path, 'w') as f:
+            json.dump(state, f)
+        with open('target/snowflake_user.tf') as f:
+            patched_config = f.read().replace('login_name = "AMIR"\n', 'login_name = "AMIR"\n    comment = "Hello"\n')
+        with open('target/snowflake_user.tf', 'w') as f:
+            f.write(patched_config)
+
+        self.connector.objects['users'] = [
+            {'name': 'AMIR', 'login_name': 'AMIR', 'comment': 'Hello', 'last_success_login': 'today'},
+            {'name': 'CHANGED', 'login_name': 'CHANGED', 'comment': 'After'},
+            {'name': 'NEW', 'login_name': 'NEW'},
+        ]
+        generator = TerraformConfigGenerator(self.connector, import_mode="single", incremental=True)
+        generator.write_resource_configs_to_tf_files()
+        self.assertEqual(sorted(generator.resource_mapping), ["snowflake_user.CHANGED", "snowflake_user.NEW"])
+        self.assertEqual(generator.removed_resource_names, {"snowflake_user.OLD"})
+
+        with mock.patch("snowglober.generate_tf_config.subprocess.run") as run:
+            generator.import_resources()
+        self.assertEqual(run.call_args_list[0].args[0][2:], ["state", "rm", "snowflake_user.CHANGED", "snowflake_user.OLD"])
+        self.assertEqual([call.args[0][3] for call in run.call_args_list[1:]], ["snowflake_user.CHANGED", "snowflake_user.NEW"])
+
+        with open('target/snowflake_user.tf') as f:
+            config = f.read()
+        self.assertIn('login_name = "AMIR"\n    comment = "Hello"\n}', config)
+        self.assertNotIn('"OLD"', config)
+        self.assertIn('resource "snowflake_user" "NEW" {', config)
+
+    def test_resources_are_written_while_they_are_extracted(self):
+        written = []
+
+        def users():
+            for i in range(3):
+                # Every user fetched so far has already been rendered and written
+                self.assertEqual(written, [f"USER_{j}" for j in range(i)])
+                yield {'name': f'USER_{i}', 'login_name': f'USER_{i}'}
+
+        self.connector.objects['users'] = users()
+        generator = TerraformConfigGenerator(self.connector)
+        generator.write_resource_configs_to_tf_files(on_resource=lambda resource: written.append(resource["name"]) if resource["type"] == "snowflake_user" else None)
+
+        self.assertEqual(written, ["USER_0", "USER_1", "USER_2"])
+        with open('target/snowflake_user.tf') as f:
+            self.assertEqual(f.read().count('resource "snowflake_user"'), 3)
+
+    def test_profiler_covers_the_extraction_threads(self):
+        generator = TerraformConfigGenerator(self.connector)
+        profiler = ThreadedProfiler()
+        profiler.runcall(generator.write_complete_resource_configs_to_tf_files)
+
+        function_names = {function_name for _, _, function_name in profiler.stats().stats}
+        self.assertIn("_generate_resource_config_for_all_objects_of_a_resource_type", function_names)
+        self.assertIn("render_block", function_names)
+
+    def test_objects_in_different_containers_get_different_names(self):
+        # Joined with '_', both schemas would be named RAW_DATA_SALES
+        self.connector.objects.update({
+            'databases': [{'name': 'RAW_DATA'}, {'name': 'RAW'}],
+            ('schemas', ('RAW_DATA',)): [{'name': 'SALES', 'database_name': 'RAW_DATA'}],
+            ('schemas', ('RAW',)): [{'name': 'DATA_SALES', 'database_name': 'RAW'}],
+        })
+        generator = TerraformConfigGenerator(self.connector)
+        generator.write_resource_configs_to_tf_files()
+
+        schema_ids = sorted(resource_id for resource_name, resource_id in generator.resource_mapping.items()
+                            if resource_name.startswith("snowflake_schema."))
+        self.assertEqual(schema_ids, ["RAW_DATA|SALES", "RAW|DATA_SALES"])
+        with open('target/snowflake_schema.tf') as f:
+            self.assertEqual(f.read().count('resource "snowflake_schema" "RAW_DATA_SALES_'), 2)
+
+    def test_per_container_resources_follow_their_containers(self):
+        self.connector.objects.update({
+            ('schemas', ('ANALYTICS',)): [
+                {'name': 'PUBLIC', 'database_name': 'ANALYTICS', 'options': 'MANAGED ACCESS'},
+                {'name': 'INFORMATION_SCHEMA', 'database_name': 'ANALYTICS'},
+            ],
+            ('stages', ('ANALYTICS', 'PUBLIC')): [
+                {'name': 'LANDING', 'database_name': 'ANALYTICS', 'schema_name': 'PUBLIC', 'url': 's3://bucket/'},
+            ],
+            ('file formats', ('ANALYTICS', 'PUBLIC')): [
+                {'name': 'CSV', 'database_name': 'ANALYTICS', 'schema_name': 'PUBLIC', 'type': 'CSV'},
+            ],
+            ('grants', ('ANALYST',)): [
+                {'role': 'ANALYST', 'granted_to': 'USER', 'grantee_name': 'AMIR'},
+                {'role': 'ANALYST', 'granted_to': 'ROLE', 'grantee_name': 'SYSADMIN'},
+            ],
+        })
+        generator = TerraformConfigGenerator(self.connector, max_parallelism=2)
+        generator.write_complete_resource_configs_to_tf_files()
+
+        schema_name = f"snowflake_schema.{sanitize_identifier('ANALYTICS|PUBLIC')}"
+        self.assertEqual(generator.resource_mapping[schema_name], "ANALYTICS|PUBLIC")
+        self.assertNotIn("ANALYTICS|INFORMATION_SCHEMA", generator.resource_mapping.values())
+        self.assertEqual(generator.resource_mapping[f"snowflake_stage.{sanitize_identifier('ANALYTICS|PUBLIC|LANDING')}"], "ANALYTICS|PUBLIC|LANDING")
+        self.assertEqual(generator.resource_mapping["snowflake_role_grants.ANALYST"], "ANALYST")
+        with open('target/snowflake_schema.tf') as f:
+            self.assertEqual(f.read(), (
+                f'resource "snowflake_schema" "{schema_name.split(".", 1)[1]}" {{\n'
+                '    database = "ANALYTICS"\n'
+                '    name = "PUBLIC"\n'
+                '    is_managed = true\n'
+                '    is_transient = false\n'
+                '}\n\n'))
+        with open('target/snowflake_file_format.tf') as f:
+            self.assertIn('    format_type = "CSV"\n', f.read())
+        with open('target/snowflake_role_grants.tf') as f:
+            role_grants_config = f.read()
+        self.assertIn('    role_name = "ANALYST"\n', role_grants_config)
+        self.assertIn('    roles = ["SYSADMIN"]\n    users = ["AMIR"]\n', role_grants_config)
+        with open('target/snowflake_sequence.tf') as f:
+            self.assertEqual(f.read(), '')
+
+    def test_extraction_levels(self):
+        generator = TerraformConfigGenerator(self.connector)
+        levels = [[resource_info["resource_type"] for resource_info in level] for level in generator._get_extraction_levels()]
+        self.assertEqual(levels[0], ["snowflake_database", "snowflake_role", "snowflake_user", "snowflake_warehouse"])
+        self.assertEqual(levels[1], ["snowflake_schema", "snowflake_role_grants"])
+        self.assertEqual(levels[2], ["snowflake_stage", "snowflake_file_format", "snowflake_sequence"])
+
+        generator.resources_to_generate = [{"resource_type": "snowflake_stage", "entity": "stages", "container": "schema"}]
+        with self.assertRaises(ValueError):
+            generator._get_extraction_levels()
+
+if __name__ == "__main__":
+    unittest.main()
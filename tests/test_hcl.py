@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from snowglober.hcl import (HCLFileWriter, escape_string, parse_block_body, parse_value, render_attribute, render_block,
+                            render_value, sanitize_identifier)
+
+class TestHCL(unittest.TestCase):
+
+    def test_sanitize_identifier(self):
+        self.assertEqual(sanitize_identifier("ANALYTICS_PUBLIC"), "ANALYTICS_PUBLIC")
+        self.assertEqual(sanitize_identifier("my-db"), "my-db")
+        dotted = sanitize_identifier("MY.DB")
+        spaced = sanitize_identifier("MY DB")
+        self.assertRegex(dotted, r"^MY_DB_[0-9a-f]{8}$")
+        self.assertNotEqual(dotted, spaced)
+        self.assertEqual(sanitize_identifier("MY.DB"), dotted)
+        self.assertRegex(sanitize_identifier("1ST_DB"), r"^_1ST_DB_[0-9a-f]{8}$")
+
+    def test_escape_string(self):
+        self.assertEqual(escape_string('say "hi"\\now\n'), 'say \\"hi\\"\\\\now\\n')
+        self.assertEqual(escape_string("${var.x} %{if}"), "$${var.x} %%{if}")
+        self.assertEqual(escape_string("$5 and 100%"), "$5 and 100%")
+
+    def test_render_value(self):
+        self.assertEqual(render_value(None), "null")
+        self.assertEqual(render_value(True), "true")
+        self.assertEqual(render_value(60), "60")
+        self.assertEqual(render_value(1.5), "1.5")
+        self.assertEqual(render_value(["ALL", 'a"b']), '["ALL", "a\\"b"]')
+        self.assertEqual(render_value({"team": "data", "cost center": 42}), '{\n        team = "data"\n        "cost center" = 42\n    }')
+
+    def test_render_block(self):
+        self.assertEqual(render_block("resource", ("snowflake_user", "AMIR"), {"name": "AMIR", "disabled": False}),
+                         'resource "snowflake_user" "AMIR" {\n    name = "AMIR"\n    disabled = false\n}\n\n')
+        self.assertEqual(render_attribute("comment", "line 1\nline 2", indent=0), 'comment = "line 1\\nline 2"\n')
+
+    def test_parse_value_reverses_render_value(self):
+        for value in [None, True, 60, -1.5, "", 'say "hi"\\now\n${var.x} %{if}', ["ALL", 'a"b'], [],
+                      {"team": "data", "cost center": 42, "tags": {"owner": None}}]:
+            self.assertEqual(parse_value(render_value(value))[0], value)
+        with self.assertRaises(ValueError):
+            parse_value("var.comment")
+
+    def test_parse_block_body(self):
+        attributes = {"name": "first.last@example.com", "disabled": False, "default_secondary_roles": ["ALL"]}
+        self.assertEqual(parse_block_body(render_block("resource", ("snowflake_user", "AMIR"), attributes)), attributes)
+        block = ('resource "snowflake_user" "AMIR" {\n'
+                 '  # edited by hand\n'
+                 '  name    = "AMIR"\n'
+                 '  comment = var.comment\n'
+                 '  lifecycle {\n'
+                 '    ignore_changes = all\n'
+                 '  }\n'
+                 '}\n')
+        self.assertEqual(parse_block_body(block), {"name": "AMIR", "comment": "var.comment", "lifecycle": {"ignore_changes": "all"}})
+
+    def test_file_writer_replaces_the_file_only_when_complete(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "snowflake_user.tf")
+            with HCLFileWriter(file_path, flush_size=10) as writer:
+                writer.write_block("resource", ("snowflake_user", "AMIR"), {"name": "AMIR"})
+                writer.write_block("resource", ("snowflake_user", "BOB"), {"name": "BOB"})
+            with open(file_path) as f:
+                self.assertEqual(f.read().count("resource "), 2)
+
+            with self.assertRaises(RuntimeError):
+                with HCLFileWriter(file_path, flush_size=10) as writer:
+                    writer.write_block("resource", ("snowflake_user", "CAROL"), {"name": "CAROL"})
+                    raise RuntimeError("extraction failed")
+            with open(file_path) as f:
+                self.assertNotIn("CAROL", f.read())
+            self.assertEqual(os.listdir(tmp_dir), ["snowflake_user.tf"])
+
+if __name__ == "__main__":
+    unittest.main()
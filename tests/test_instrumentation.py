@@ -0,0 +1,126 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from snowglober.instrumentation import RunReport, ThreadedProfiler
+
+class TestRunReport(unittest.TestCase):
+
+    def test_stages_record_time_counts_and_subprocesses(self):
+        report = RunReport()
+        with report.stage("import", import_mode="single") as record:
+            report.count_objects(3)
+            with report.stage("import_shard", shard="target/shard_0"):
+                report.count_objects()
+                report.record_subprocess(0.25)
+            report.record_slowest([(0.1, "snowflake_user.A"), (0.3, "snowflake_user.B")], count=1)
+
+        shard, outer = report.stages
+        self.assertEqual(outer["stage"], "import")
+        self.assertEqual(outer["import_mode"], "single")
+        self.assertEqual(outer["objects"], 3)
+        self.assertEqual(shard["objects"], 1)
+        self.assertEqual((outer["subprocesses"], outer["subprocess_time"]), (1, 0.25))
+        self.assertEqual(record["slowest"], [{"name": "snowflake_user.B", "seconds": 0.3}])
+        self.assertGreaterEqual(outer["wall_time"], 0)
+        self.assertEqual(report.subprocess_time, 0.25)
+
+    def test_failed_stage_is_recorded(self):
+        report = RunReport()
+        with self.assertRaises(RuntimeError):
+            with report.stage("terraform_init"):
+                raise RuntimeError("terraform not found")
+        self.assertTrue(report.stages[0]["failed"])
+
+    def test_stages_are_per_thread(self):
+        report = RunReport()
+
+        def extract(entity):
+            with report.stage("extract_and_render", entity=entity):
+                report.count_objects(len(entity))
+
+        threads = [threading.Thread(target=extract, args=(entity,)) for entity in ("users", "roles", "databases")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual({record["entity"]: record["objects"] for record in report.stages}, {"users": 5, "roles": 5, "databases": 9})
+
+    def test_timed_iter(self):
+        report = RunReport()
+        record = {}
+
+        def slow_rows():
+            for i in range(3):
+                time.sleep(0.01)
+                yield i
+
+        self.assertEqual(list(report.timed_iter(slow_rows(), record, "extract_time")), [0, 1, 2])
+        self.assertGreaterEqual(record["extract_time"], 0.03)
+
+    def test_write(self):
+        report = RunReport()
+        with report.stage("run"):
+            pass
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "run_report.json")
+            report.write(file_path)
+            with open(file_path) as f:
+                written = json.load(f)
+        self.assertEqual([record["stage"] for record in written["stages"]], ["run"])
+        self.assertIn("peak_memory_mb", written)
+
+    def test_threaded_profiler_profiles_worker_threads(self):
+        def work_in_worker_thread(n):
+            return sum(range(n))
+
+        def run():
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                return list(executor.map(work_in_worker_thread, [1000, 2000]))
+
+        profiler = ThreadedProfiler()
+        self.assertEqual(profiler.runcall(run), [sum(range(1000)), sum(range(2000))])
+
+        function_names = {function_name for _, _, function_name in profiler.stats().stats}
+        self.assertIn("run", function_names)
+        self.assertIn("work_in_worker_thread", function_names)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profiler.dump_stats(os.path.join(tmp_dir, "profile.pstats"))
+            self.assertTrue(os.path.exists(os.path.join(tmp_dir, "profile.pstats")))
+
+    def test_threaded_profiler_creates_at_most_one_profiler_per_thread(self):
+        def calls_in_worker_thread(n):
+            for _ in range(n):
+                abs(-1)
+            return n
+
+        def run():
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                return list(executor.map(calls_in_worker_thread, [5000, 5000]))
+
+        for enable_fails in (False, True):
+            profiler = ThreadedProfiler()
+            created = []
+            profile_class = profiler._profile_class
+
+            class CountingProfile(profile_class):
+                def __init__(self):
+                    super().__init__()
+                    created.append(self)
+
+                def enable(self):
+                    if enable_fails:  # as when another profiler is already active
+                        raise ValueError("Another profiling tool is already active")
+                    super().enable()
+
+            profiler._profile_class = CountingProfile
+            profiler.runcall(run)
+            profiler.stats()
+            self.assertLessEqual(len(created), 2)
+
+if __name__ == "__main__":
+    unittest.main()
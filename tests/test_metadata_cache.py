@@ -0,0 +1,78 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from snowglober.metadata_cache import MetadataCache
+from snowglober.snowflake_connector import SnowflakeConnector
+from test_snowflake_connector import FakeConnection
+
+class TestMetadataCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp_dir.name, '.cache')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_write_through_and_get(self):
+        cache = MetadataCache(self.cache_dir)
+        self.assertIsNone(cache.get('ACCOUNT', 'SYSADMIN', 'show users'))
+
+        rows = [{'name': 'ALICE', 'created_on': '2024-01-01'}, {'name': 'BOB', 'created_on': '2024-01-02'}]
+        self.assertEqual(list(cache.write_through('ACCOUNT', 'SYSADMIN', 'show users', iter(rows))), rows)
+
+        self.assertEqual(list(cache.get('ACCOUNT', 'SYSADMIN', 'show users')), rows)
+        # The key includes the role
+        self.assertIsNone(cache.get('ACCOUNT', 'ACCOUNTADMIN', 'show users'))
+
+    def test_partially_read_results_are_not_cached(self):
+        cache = MetadataCache(self.cache_dir)
+        rows = cache.write_through('ACCOUNT', 'SYSADMIN', 'show users', iter([{'name': 'ALICE'}, {'name': 'BOB'}]))
+        next(rows)
+        rows.close()
+
+        self.assertIsNone(cache.get('ACCOUNT', 'SYSADMIN', 'show users'))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_ttl_and_refresh(self):
+        cache = MetadataCache(self.cache_dir, ttl=60)
+        list(cache.write_through('ACCOUNT', 'SYSADMIN', 'show users', iter([{'name': 'ALICE'}])))
+        self.assertIsNotNone(cache.get('ACCOUNT', 'SYSADMIN', 'show users'))
+
+        with mock.patch('time.time', return_value=time.time() + 61):
+            self.assertIsNone(cache.get('ACCOUNT', 'SYSADMIN', 'show users'))
+        self.assertIsNone(MetadataCache(self.cache_dir, refresh=True).get('ACCOUNT', 'SYSADMIN', 'show users'))
+
+    def test_invalidate(self):
+        cache = MetadataCache(self.cache_dir)
+        for query in ('show users', 'show roles'):
+            for role in ('SYSADMIN', 'ACCOUNTADMIN'):
+                list(cache.write_through('ACCOUNT', role, query, iter([{'name': 'X'}])))
+
+        self.assertEqual(cache.invalidate(query='show users', role='SYSADMIN'), 1)
+        self.assertIsNone(cache.get('ACCOUNT', 'SYSADMIN', 'show users'))
+        self.assertIsNotNone(cache.get('ACCOUNT', 'ACCOUNTADMIN', 'show users'))
+        self.assertEqual(cache.invalidate(role='ACCOUNTADMIN'), 2)
+        self.assertEqual(cache.invalidate(), 1)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_connector_serves_cached_results_without_connecting(self):
+        FakeConnection.opened = 0
+        FakeConnection.delays = {}
+        FakeConnection.rows_per_query = 2
+        cache = MetadataCache(self.cache_dir)
+        with mock.patch.object(SnowflakeConnector, '_connect', side_effect=FakeConnection):
+            connector = SnowflakeConnector(cache=cache)
+            self.assertEqual(FakeConnection.opened, 0)
+            first_run = list(connector.iter_all_objects_of_a_resource_type('users'))
+            self.assertEqual(FakeConnection.opened, 1)
+
+            connector = SnowflakeConnector(cache=cache)
+            self.assertEqual(connector.get_all_objects_of_a_resource_type('users'), first_run)
+            self.assertEqual(list(connector.iter_all_objects_of_a_resource_type('users')), first_run)
+            self.assertEqual(FakeConnection.opened, 1)
+
+if __name__ == "__main__":
+    unittest.main()
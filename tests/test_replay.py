@@ -0,0 +1,74 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from snowglober.generate_tf_config import TerraformConfigGenerator
+from snowglober.replay import RecordingConnector, ReplayConnector, fixture_file_path
+from test_snowflake_connector import FakeConnection
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks')
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from synthetic_account import write_synthetic_account
+
+class TestRecordAndReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.fixture_dir = os.path.join(self.tmp_dir.name, 'fixtures')
+        FakeConnection.delays = {}
+        FakeConnection.rows_per_query = 3
+        FakeConnection.fetched_batch_sizes = []
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_replay_serves_recorded_results(self):
+        with mock.patch.object(RecordingConnector, '_connect', side_effect=FakeConnection):
+            recorder = RecordingConnector(self.fixture_dir)
+            recorded_users = recorder.get_all_objects_of_a_resource_type('users')
+            recorded_roles = list(recorder.iter_all_objects_of_a_resource_type('roles', batch_size=2))
+
+        replayer = ReplayConnector(self.fixture_dir)
+        self.assertEqual(replayer.get_all_objects_of_a_resource_type('users'), recorded_users)
+        self.assertEqual(list(replayer.iter_all_objects_of_a_resource_type('roles')), recorded_roles)
+        self.assertEqual(dict(replayer.get_all_objects_concurrently(['users', 'roles'])), {'users': recorded_users, 'roles': recorded_roles})
+        self.assertTrue(os.path.exists(fixture_file_path(self.fixture_dir, 'show users')))
+
+    def test_replay_without_recording(self):
+        replayer = ReplayConnector(self.fixture_dir)
+        with self.assertRaises(FileNotFoundError):
+            replayer.get_all_objects_of_a_resource_type('warehouses')
+        with self.assertRaises(ValueError):
+            replayer.get_all_objects_of_a_resource_type('tables')
+
+    def test_pipeline_runs_offline_on_a_synthetic_account(self):
+        counts = write_synthetic_account(self.fixture_dir, 200)
+        bin_dir = os.path.join(self.tmp_dir.name, 'bin')
+        os.makedirs(bin_dir)
+        os.symlink(os.path.join(BENCHMARKS_DIR, 'fake_terraform.py'), os.path.join(bin_dir, 'terraform'))
+
+        original_cwd = os.getcwd()
+        os.chdir(self.tmp_dir.name)
+        try:
+            with mock.patch.dict(os.environ, {'PATH': bin_dir + os.pathsep + os.environ['PATH']}), contextlib.redirect_stdout(io.StringIO()):
+                generator = TerraformConfigGenerator(ReplayConnector(self.fixture_dir), import_mode="batch")
+                generator.write_resource_configs_to_tf_files()
+                generator.run_terraform_init()
+                generator.import_resources()
+                generator.update_tf_files_with_optional_properties()
+
+            self.assertEqual(len(generator.resource_mapping), sum(counts.values()))
+            with open(generator.tfstate_file_path) as f:
+                self.assertEqual(len(json.load(f)["resources"]), sum(counts.values()))
+            with open('target/snowflake_stage.tf') as f:
+                self.assertIn('    comment = "Imported by fake terraform"\n}', f.read())
+        finally:
+            os.chdir(original_cwd)
+
+if __name__ == "__main__":
+    unittest.main()
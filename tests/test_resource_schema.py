@@ -0,0 +1,48 @@
+import unittest
+from snowglober.resource_schema import ResourceSchema, compile_resource_schemas
+
+class TestResourceSchema(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = ResourceSchema(
+            "snowflake_user",
+            required_properties=["name", "login_name"],
+            optional_properties=["comment", "email", "comment"],
+            names_to_ignore=["Snowflake", "*_TEMP", "re:SVC_[0-9]+$"],
+            show_columns={"comment": ("comment", str)},
+        )
+
+    def test_properties_are_compiled(self):
+        self.assertEqual(self.schema.required_properties, ("name", "login_name"))
+        self.assertEqual(self.schema.optional_properties, frozenset({"comment", "email"}))
+        self.assertEqual(self.schema.hashed_columns, ("comment", "login_name", "name"))
+
+    def test_is_ignored(self):
+        self.assertTrue(self.schema.is_ignored("SNOWFLAKE"))
+        self.assertTrue(self.schema.is_ignored("loader_temp"))
+        self.assertTrue(self.schema.is_ignored("SVC_42"))
+        self.assertFalse(self.schema.is_ignored("SVC_42_ADMIN"))
+        self.assertFalse(self.schema.is_ignored("AMIR"))
+        self.assertFalse(self.schema.is_ignored("TEMP_LOADER"))
+
+    def test_schema_is_immutable(self):
+        with self.assertRaises(AttributeError):
+            self.schema.required_properties = ("name",)
+        with self.assertRaises(TypeError):
+            self.schema.show_columns["email"] = ("email", str)
+
+    def test_compile_resource_schemas(self):
+        schemas = compile_resource_schemas({
+            "snowflake_role": {"required_properties": ["name"], "optional_properties": ["comment"], "names_to_ignore": []},
+        })
+        self.assertFalse(schemas["snowflake_role"].is_ignored("ANALYST"))
+        with self.assertRaises(TypeError):
+            schemas["snowflake_user"] = self.schema
+
+    def test_thousands_of_ignore_patterns(self):
+        schema = ResourceSchema("snowflake_user", ["name"], [], [f"SVC_{i}_*" for i in range(5000)])
+        self.assertTrue(schema.is_ignored("SVC_4999_LOADER"))
+        self.assertFalse(schema.is_ignored("SVC_5000_LOADER"))
+
+if __name__ == "__main__":
+    unittest.main()
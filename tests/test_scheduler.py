@@ -0,0 +1,48 @@
+import threading
+import time
+import unittest
+from snowglober.scheduler import ContainerScheduler
+
+class TestContainerScheduler(unittest.TestCase):
+
+    def test_map_unordered_limits_parallelism(self):
+        lock = threading.Lock()
+        running = [0]
+        max_running = [0]
+
+        def show_schemas(container):
+            with lock:
+                running[0] += 1
+                max_running[0] = max(max_running[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return [f"{container[0]}.PUBLIC"]
+
+        containers = [(f"DB_{i}",) for i in range(20)]
+        with ContainerScheduler(max_parallelism=3) as scheduler:
+            results = dict(scheduler.map_unordered(show_schemas, containers))
+
+        self.assertEqual(sorted(results), sorted(containers))
+        self.assertEqual(results[("DB_7",)], ["DB_7.PUBLIC"])
+        self.assertEqual(max_running[0], 3)
+
+    def test_map_unordered_yields_as_completed(self):
+        with ContainerScheduler(max_parallelism=2) as scheduler:
+            results = [container for container, _ in scheduler.map_unordered(time.sleep, [0.2, 0.01])]
+        self.assertEqual(results, [0.01, 0.2])
+
+    def test_map_unordered_raises_errors(self):
+        def fail(container):
+            raise RuntimeError(container)
+
+        with ContainerScheduler(max_parallelism=2) as scheduler:
+            with self.assertRaises(RuntimeError):
+                list(scheduler.map_unordered(fail, ["DB"]))
+
+    def test_invalid_max_parallelism(self):
+        with self.assertRaises(ValueError):
+            ContainerScheduler(max_parallelism=0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,63 @@
+import os
+import threading
+import time
 import unittest
 from pprint import pprint
+from unittest import mock
+from dotenv import load_dotenv
 from snowglober.snowflake_connector import SnowflakeConnector
 
+load_dotenv()
+
+class FakeCursor:
+    """A DictCursor stand-in that answers SHOW queries after a delay."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def execute(self, query):
+        entity = query.split()[-1]
+        with self.connection.lock:
+            self.connection.running += 1
+            self.connection.max_running = max(self.connection.max_running, self.connection.running)
+        time.sleep(self.connection.delays.get(entity, 0.1))
+        with self.connection.lock:
+            self.connection.running -= 1
+        self.rows = [{'name': f'{entity.upper()}_{i}'} for i in range(1, self.connection.rows_per_query + 1)]
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        self.connection.fetched_batch_sizes.append(len(batch))
+        return batch
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    """A snowflake connection stand-in; all instances share the same counters."""
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+    delays = {}
+    opened = 0
+    rows_per_query = 1
+    fetched_batch_sizes = []
+
+    def __init__(self):
+        with FakeConnection.lock:
+            FakeConnection.opened += 1
+
+    def cursor(self, cursor_class):
+        return FakeCursor(FakeConnection)
+
+    def close(self):
+        pass
+
+@unittest.skipUnless(os.getenv('SNOWFLAKE_ACCOUNT'), "needs a Snowflake login (SNOWFLAKE_* environment variables)")
 class TestSnowflakeConnector(unittest.TestCase):
     
     def setUp(self):
@@ -9,32 +65,95 @@ class TestSnowflakeConnector(unittest.TestCase):
         self.connector = SnowflakeConnector()
     
     def test_get_all_databases(self):
-        databases = self.connector.get_all_databases()
+        databases = self.connector.get_all_objects_of_a_resource_type('databases')
         print("!!!!!!!!!!!!! Starting test_get_all_databases !!!!!!!!!!!!! \n")
         for db in databases:
             pprint(db)
             print()  # Add an empty line for better separation between items
 
     def test_get_all_users(self):
-        users = self.connector.get_all_users()
+        users = self.connector.get_all_objects_of_a_resource_type('users')
         print("!!!!!!!!!!!!! Starting test_get_all_users !!!!!!!!!!!!! \n")
         for user in users:
             pprint(user)
             print()
 
     def test_get_all_warehouses(self):
-        warehouses = self.connector.get_all_warehouses()
+        warehouses = self.connector.get_all_objects_of_a_resource_type('warehouses')
         print("!!!!!!!!!!!!! Starting test_get_all_warehouses !!!!!!!!!!!!! \n")
         for warehouse in warehouses:
             pprint(warehouse)
             print()
 
     def test_get_all_roles(self):
-        roles = self.connector.get_all_roles()
+        roles = self.connector.get_all_objects_of_a_resource_type('roles')
         print("!!!!!!!!!!!!! Starting test_get_all_roles !!!!!!!!!!!!! \n")
         for role in roles:
             pprint(role)
             print()
 
+class TestSnowflakeConnectorConcurrency(unittest.TestCase):
+    """These tests use a fake connection and run without network access."""
+
+    def setUp(self):
+        FakeConnection.running = FakeConnection.max_running = FakeConnection.opened = 0
+        FakeConnection.delays = {'databases': 0.1, 'roles': 0.1, 'users': 0.3, 'warehouses': 0.1}
+        FakeConnection.rows_per_query = 1
+        FakeConnection.fetched_batch_sizes = []
+        with mock.patch.object(SnowflakeConnector, '_connect', side_effect=FakeConnection):
+            self.connector = SnowflakeConnector(max_connections=4)
+        self.patcher = mock.patch.object(self.connector, '_connect', side_effect=FakeConnection)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_get_all_objects_concurrently(self):
+        entities = ['databases', 'roles', 'users', 'warehouses']
+        start_time = time.perf_counter()
+        results = list(self.connector.get_all_objects_concurrently(entities))
+        elapsed_time = time.perf_counter() - start_time
+
+        self.assertEqual(sorted(entity for entity, _ in results), entities)
+        self.assertEqual(dict(results)['users'], [{'name': 'USERS_1'}])
+        # The slowest query comes last and the total is about as long as the slowest query
+        self.assertEqual(results[-1][0], 'users')
+        self.assertLess(elapsed_time, 0.5)
+        self.assertEqual(FakeConnection.max_running, 4)
+        self.assertLessEqual(FakeConnection.opened, 4)
+
+    def test_pool_limits_concurrent_queries(self):
+        self.connector.max_connections = 2
+        list(self.connector.get_all_objects_concurrently(['databases', 'roles', 'users', 'warehouses'], max_workers=4))
+        self.assertEqual(FakeConnection.max_running, 2)
+        self.assertEqual(FakeConnection.opened, 2)
+
+    def test_iter_all_objects_fetches_in_batches(self):
+        FakeConnection.rows_per_query = 5
+        FakeConnection.delays = {}
+        users = self.connector.iter_all_objects_of_a_resource_type('users', batch_size=2)
+
+        self.assertEqual(next(users), {'name': 'USERS_1'})
+        self.assertEqual(FakeConnection.fetched_batch_sizes, [2])
+        self.assertEqual([user['name'] for user in users], ['USERS_2', 'USERS_3', 'USERS_4', 'USERS_5'])
+        self.assertEqual(FakeConnection.fetched_batch_sizes, [2, 2, 1, 0])
+
+    def test_build_show_query(self):
+        self.assertEqual(self.connector._build_show_query('users'), 'show users')
+        self.assertEqual(self.connector._build_show_query('schemas', ('ANALYTICS',)), 'show schemas in database "ANALYTICS"')
+        self.assertEqual(self.connector._build_show_query('file formats', ('ANALYTICS', 'My "Schema"')),
+                         'show file formats in schema "ANALYTICS"."My ""Schema"""')
+        self.assertEqual(self.connector._build_show_query('grants', ('ANALYST',)), 'show grants of role "ANALYST"')
+        with self.assertRaises(ValueError):
+            self.connector._build_show_query('stages', ('ANALYTICS',))
+        with self.assertRaises(ValueError):
+            self.connector._build_show_query('schemas')
+        with self.assertRaises(ValueError):
+            self.connector._build_show_query('tables', ('ANALYTICS', 'PUBLIC'))
+
+    def test_get_all_objects_concurrently_rejects_invalid_entity(self):
+        with self.assertRaises(ValueError):
+            list(self.connector.get_all_objects_concurrently(['databases', 'tables']))
+
 if __name__ == "__main__":
     unittest.main()